@@ -1,16 +1,26 @@
 import os
 
-try:
-    import openai
-except Exception:
-    openai = None
+openai = None
+
+def _import_openai():
+    """The openai module, imported only once a key makes it usable."""
+    global openai
+    if openai is None:
+        try:
+            import openai as module
+        except Exception:
+            return None
+        openai = module
+    return openai
 
 class AIEngine:
     """Simple wrapper around OpenAI's ChatCompletion API."""
-    def __init__(self, model: str = "gpt-3.5-turbo"):
+    def __init__(self, model: str = "gpt-3.5-turbo", timeout: float = 20):
         self.model = model
+        # seconds before a request is abandoned
+        self.timeout = timeout
         self.api_key = os.environ.get("OPENAI_API_KEY")
-        self.available = openai is not None and self.api_key
+        self.available = bool(self.api_key) and _import_openai() is not None
         if self.available:
             openai.api_key = self.api_key
 
@@ -22,6 +32,7 @@ class AIEngine:
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
+                request_timeout=self.timeout,
             )
             return resp.choices[0].message.content.strip()
         except Exception as e:
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+from metrics import METRICS
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a question: case, spacing and trailing punctuation ignored."""
+    return ' '.join(query.lower().split()).rstrip('?!. ')
+
+
+class AnswerCache:
+    """Bounded LRU of answers that expire after ``ttl`` seconds.
+
+    Lookups of a question that is already being answered wait for that
+    answer instead of asking again. Failed lookups are not cached.
+    """
+    def __init__(self, max_entries: int = 512, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expiry, answer), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, query: str, compute: Callable[[str], str]) -> str:
+        """Cached answer for ``query``, calling ``compute(query)`` on a miss."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                METRICS.inc('chat_answer_cache_total', outcome='hit')
+                return entry[1]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+        if not owner:
+            METRICS.inc('chat_answer_cache_total', outcome='shared')
+            return pending.result()
+        METRICS.inc('chat_answer_cache_total', outcome='miss')
+        try:
+            answer = compute(query)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        pending.set_result(answer)
+        return answer
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
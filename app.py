@@ -1,27 +1,104 @@
+import json
+import logging
 import os
-from flask import Flask, render_template, request, redirect, url_for, jsonify
-from scheduler import Scheduler, Employee
+import queue
+import threading
+import uuid
+from datetime import date
+from flask import (Flask, Response, g, render_template, request, redirect, url_for, jsonify,
+                   make_response, stream_with_context)
+from scheduler import Scheduler, Employee, demand_from_roles
 from chatbot import ChatBot
+from jobs import SolveJobQueue
+from metrics import METRICS
+from storage import SQLiteRosterStore
+import exporter
 
 app = Flask(__name__)
+logging.basicConfig(level=logging.INFO)
 
 # Persistent scheduler using data directory
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-scheduler = Scheduler(data_dir=DATA_DIR)
+DATA_DIR = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(__file__), "data"))
+# CP-SAT limits so a large roster cannot hang a request worker
+SOLVER_TIME_LIMIT = float(os.environ.get('SOLVER_TIME_LIMIT', 30))
+SOLVER_WORKERS = int(os.environ.get('SOLVER_WORKERS', os.cpu_count() or 1))
+# roster shared with the Discord bot through SQLite
+ROSTER_DB = os.environ.get('ROSTER_DB', os.path.join(DATA_DIR, 'roster.db'))
+# load the roster on a background thread so the server accepts connections at once
+FAST_START = os.environ.get('FAST_START', '1') != '0'
+# seconds a request waits for the roster before answering 503
+READY_TIMEOUT = float(os.environ.get('READY_TIMEOUT', 60))
+# longest multi-week plan a request may ask for
+HORIZON_MAX_WEEKS = int(os.environ.get('HORIZON_MAX_WEEKS', 52))
+# seconds of CP-SAT a multi-week plan may use in total, shared between its windows
+HORIZON_TIME_BUDGET = float(os.environ.get('HORIZON_TIME_BUDGET', 2 * SOLVER_TIME_LIMIT))
+scheduler = Scheduler(data_dir=DATA_DIR, time_limit=SOLVER_TIME_LIMIT,
+                      num_workers=SOLVER_WORKERS, store=SQLiteRosterStore(ROSTER_DB),
+                      background=FAST_START)
 chatbot = ChatBot(scheduler, data_dir=DATA_DIR)
+# solves work on roster snapshots, so jobs for different rosters or methods run side by side
+jobs = SolveJobQueue(scheduler, max_workers=int(os.environ.get('SOLVE_JOB_WORKERS', 4)))
+
+@app.before_request
+def refresh_roster():
+    if request.endpoint in ('healthz', 'metrics', 'static'):
+        return None
+    if not scheduler.wait_ready(READY_TIMEOUT):
+        response = jsonify({'error': 'Roster is still loading'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    # pick up edits made by the Discord bot
+    scheduler.refresh()
+
+@app.route('/healthz')
+def healthz():
+    """Readiness probe: 200 once the roster has loaded, 503 until then."""
+    if not scheduler.ready.is_set():
+        return jsonify({'status': 'loading'}), 503
+    if scheduler.load_error is not None:
+        return jsonify({'status': 'failed', 'error': str(scheduler.load_error)}), 500
+    return jsonify({'status': 'ready', 'employees': len(scheduler.registry)})
 
 @app.route('/')
 def index():
     method = request.args.get('method', 'ai')
     randomize = method == 'random'
-    schedule = scheduler.generate_schedule(randomize=randomize)
-    return render_template('index.html', schedule=schedule, employees=scheduler.employees)
+    # method=incremental warm-starts from this process's previous solve
+    incremental = method == 'incremental'
+    etag = scheduler.schedule_etag(randomize=randomize, incremental=incremental)
+    if etag is not None and request.if_none_match.contains(etag):
+        # roster unchanged since the client's copy: skip solving and rendering
+        response = app.response_class(status=304)
+    else:
+        schedule = scheduler.generate_schedule(randomize=randomize, incremental=incremental)
+        g.solve_stats = scheduler.last_solve_stats
+        response = make_response(render_template('index.html', schedule=schedule,
+                                                 employees=scheduler.employees,
+                                                 uncoverable=scheduler.uncoverable_slots()))
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.after_request
+def add_debug_timing(response):
+    # opt-in per request: send "X-Debug-Timing: 1" to see where the time went
+    stats = g.get('solve_stats')
+    if stats is not None and request.headers.get('X-Debug-Timing'):
+        response.headers['X-Schedule-Stats'] = stats.header()
+    return response
+
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/employees', methods=['POST'])
 def add_employee():
     name = request.form['name']
     max_hours = int(request.form.get('max_hours', 40))
-    scheduler.add_employee(Employee(name=name, max_hours=max_hours))
+    role = request.form.get('role', '')
+    scheduler.add_employee(Employee(name=name, max_hours=max_hours, role=role))
     return redirect(url_for('index'))
 
 @app.route('/availability/<int:emp_id>', methods=['POST'])
@@ -51,20 +128,188 @@ def import_file():
             path = f"{base}_{i}{ext}"
             i += 1
         file.save(path)
-        scheduler.import_file(path)
+        if request.args.get('stream'):
+            return Response(stream_with_context(_stream_import(path)),
+                            mimetype='application/x-ndjson')
+        report = scheduler.import_file(path)
+        for row, error in report.errors:
+            app.logger.warning("Import %s row %s skipped: %s", fname, row, error)
     return redirect(url_for('index'))
 
+def _stream_import(path):
+    """Yield one JSON line per parsed chunk, then the import report."""
+    def run(emit):
+        report = scheduler.import_file(
+            path, progress=lambda done, total: emit({'done': done, 'total': total}))
+        emit({'added': report.added, 'updated': report.updated, 'errors': report.errors})
+
+    for event in _events(run):
+        yield json.dumps(event) + '\n'
+
+def _events(work):
+    """Run ``work(emit)`` on a thread and yield what it emits as it arrives."""
+    events = queue.Queue()
+
+    def run():
+        try:
+            work(events.put)
+        except Exception as e:
+            events.put({'error': str(e)})
+        events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    yield from iter(events.get, None)
+
+@app.route('/schedule/stream')
+def stream_schedule():
+    """Server-Sent Events: every improving CP-SAT schedule, then the final one.
+
+    ``gap`` (e.g. 0.05) stops once the schedule is provably within that
+    fraction of optimal, ``deadline`` (seconds, at most ``SOLVER_TIME_LIMIT``)
+    caps the search. The search stops at its next solution once the client
+    has gone.
+    """
+    gap = request.args.get('gap', type=float)
+    deadline = min(request.args.get('deadline', SOLVER_TIME_LIMIT, type=float),
+                   SOLVER_TIME_LIMIT)
+    incremental = request.args.get('method', 'ai') == 'incremental'
+    closed = threading.Event()
+
+    def publish(emit, solution):
+        emit(dict(solution, event='solution'))
+        return not closed.is_set()
+
+    def run(emit):
+        schedule = scheduler.generate_schedule(
+            incremental=incremental, time_limit=deadline, gap=gap,
+            on_solution=lambda solution: publish(emit, solution))
+        emit({'event': 'done', 'schedule': schedule})
+
+    def generate():
+        try:
+            for data in _events(run):
+                event = data.pop('event', 'error')
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # the client disconnected or the stream ended; let the solve wind down
+            closed.set()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/schedule/export')
+def export_schedule():
+    """Download the schedule as ``format`` csv, xlsx or ics.
+
+    ``employee`` (id or name) limits it to one person's shifts, e.g. as a
+    personal calendar feed; ``week`` (YYYY-MM-DD) is the Monday it starts on.
+    ``weeks`` exports that many weeks planned with ``generate_horizon``.
+    """
+    from werkzeug.utils import secure_filename
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        return jsonify({'error': f"Unknown export format '{fmt}'"}), 400
+    try:
+        week = request.args.get('week')
+        week_start = date.fromisoformat(week) if week else None
+    except ValueError:
+        return jsonify({'error': 'week must be a date like 2024-01-01'}), 400
+    if week_start is not None and week_start.weekday() != 0:
+        return jsonify({'error': 'week must be a Monday'}), 400
+    employee = None
+    ref = request.args.get('employee')
+    if ref:
+        emp = scheduler.registry.get(int(ref)) if ref.isdigit() else scheduler.find_employee(ref)
+        if emp is None:
+            return jsonify({'error': 'Employee not found'}), 404
+        employee = emp.name
+    weeks = request.args.get('weeks', 1, type=int)
+    if not 1 <= weeks <= HORIZON_MAX_WEEKS:
+        return jsonify({'error': f'weeks must be between 1 and {HORIZON_MAX_WEEKS}'}), 400
+    if weeks > 1:
+        schedule = scheduler.generate_horizon(weeks, budget=HORIZON_TIME_BUDGET).weeks
+    else:
+        method = request.args.get('method', 'ai')
+        schedule = scheduler.generate_schedule(randomize=method == 'random',
+                                               incremental=method == 'incremental')
+    name = secure_filename(exporter.filename(fmt, week_start, employee))
+    return Response(stream_with_context(exporter.export(schedule, fmt, week_start, employee)),
+                    mimetype=exporter.FORMATS[fmt][1],
+                    headers={'Content-Disposition': f'attachment; filename="{name}"'})
+
+@app.route('/schedule/horizon', methods=['POST'])
+def schedule_horizon():
+    """Plan several weeks against per-shift, per-role staffing demand.
+
+    JSON body: ``weeks``, ``window_weeks``, ``carry_over``, ``parallel`` and
+    ``demand`` in the chatbot's form, e.g. ``{"Mon": ["2 cook", "manager"],
+    "Sat evening": ["3"]}``; without demand every shift needs one person.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        weeks = int(data.get('weeks', 4))
+        if weeks > HORIZON_MAX_WEEKS:
+            raise ValueError(f'weeks must be at most {HORIZON_MAX_WEEKS}')
+        demand = data.get('demand')
+        parallel = data.get('parallel')
+        carry_over = data.get('carry_over', True)
+        if not isinstance(carry_over, bool):
+            raise ValueError('carry_over must be true or false')
+        plan = scheduler.generate_horizon(
+            weeks=weeks,
+            demand=demand_from_roles(demand) if demand else None,
+            window_weeks=int(data.get('window_weeks', 1)),
+            carry_over=carry_over,
+            parallel=int(parallel) if parallel is not None else None,
+            budget=HORIZON_TIME_BUDGET,
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(plan.to_dict())
+
+@app.route('/schedule/jobs', methods=['POST'])
+def submit_schedule_job():
+    data = request.get_json(silent=True) or request.form
+    try:
+        time_limit = data.get('time_limit')
+        num_workers = data.get('num_workers')
+        job = jobs.submit(
+            method=data.get('method', 'ai'),
+            time_limit=float(time_limit) if time_limit is not None else None,
+            num_workers=int(num_workers) if num_workers is not None else None,
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('schedule_job', job_id=job.id)
+    return response
+
+@app.route('/schedule/jobs/<job_id>')
+def schedule_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
 
 @app.route('/chat', methods=['GET', 'POST'])
 def chat():
+    # one conversation per browser, identified by a cookie
+    session_id = request.cookies.get('chat_session') or uuid.uuid4().hex
     if request.method == 'POST':
         data = request.get_json(force=True)
         message = data.get('message', '')
-        reply = chatbot.handle_message(message)
-        return jsonify({'reply': reply, 'prompt': chatbot.get_prompt()})
-    # initial load
-    prompt = chatbot.get_prompt()
-    return render_template('chat.html', prompt=prompt)
+        reply = chatbot.handle_message(message, session_id)
+        response = jsonify({'reply': reply, 'prompt': chatbot.get_prompt(session_id)})
+    else:
+        # initial load
+        prompt = chatbot.get_prompt(session_id)
+        response = make_response(render_template('chat.html', prompt=prompt))
+    response.set_cookie('chat_session', session_id, max_age=30 * 24 * 3600, httponly=True,
+                        samesite='Lax')
+    return response
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Multi-week planning: rolling windows vs. one model for the whole horizon.
+
+Every shift needs several staff across a few roles. Each horizon length is
+planned as one-week windows with carry-over, as independent windows (each
+distinct length solved once, in parallel) and as a single monolithic model,
+each on a fresh Scheduler so no plan is served from the cache. The script
+reports wall time, unfilled seats and the spread of hours per employee.
+
+Usage: python benchmarks/bench_horizon.py [--employees 300] [--weeks 1,2,4,8,12]
+"""
+import argparse
+import json
+import time
+
+from roster import build_scheduler, generate_roster
+
+from scheduler import ALL_SLOTS, CP_MODEL, _optional
+
+ROLES = ('cook', 'server', 'manager')
+# staff per shift and role
+PER_SHIFT = {'cook': 2, 'server': 3, 'manager': 1}
+
+
+def plan(scheduler, weeks: int, window_weeks: int, carry_over: bool) -> dict:
+    demand = {(day, shift, role): count for day, shift in ALL_SLOTS
+              for role, count in PER_SHIFT.items()}
+    start = time.perf_counter()
+    result = scheduler.generate_horizon(weeks, demand, window_weeks=window_weeks,
+                                        carry_over=carry_over)
+    wall = time.perf_counter() - start
+    hours = sorted(result.hours.values()) or [0]
+    return {'wall_s': round(wall, 3), 'windows': len(result.stats),
+            'status': sorted({st.status for st in result.stats}),
+            'unfilled': result.unfilled, 'staffed': len(result.hours),
+            'hours_min': hours[0], 'hours_max': hours[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-week horizons")
+    parser.add_argument('--employees', type=int, default=300)
+    parser.add_argument('--weeks', default='1,2,4,8,12')
+    parser.add_argument('--modes', default='rolling,parallel,monolithic')
+    parser.add_argument('--time-limit', type=float, default=60,
+                        help="CP-SAT limit per window (per horizon for monolithic)")
+    args = parser.parse_args()
+    records = generate_roster(args.employees, density=0.6, roles=ROLES)
+    # import OR-Tools up front so the first row does not pay for it
+    _optional(CP_MODEL)
+    modes = {'rolling': (1, True), 'parallel': (1, False), 'monolithic': (None, True)}
+    for weeks in map(int, args.weeks.split(',')):
+        for mode in args.modes.split(','):
+            window_weeks, carry_over = modes[mode]
+            row = {'employees': args.employees, 'weeks': weeks, 'mode': mode}
+            # a fresh scheduler, so no mode is answered from another's cached plan
+            scheduler = build_scheduler(records, time_limit=args.time_limit)
+            try:
+                row.update(plan(scheduler, weeks, window_weeks or weeks, carry_over))
+            finally:
+                scheduler.close()
+            print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
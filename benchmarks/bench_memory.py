@@ -0,0 +1,76 @@
+"""Memory per employee: bitmask Employee vs. the old dict-of-sets layout.
+
+Usage: python benchmarks/bench_memory.py [employees]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Set
+
+from roster import generate_roster
+
+from scheduler import Employee, EmployeeRegistry, _optional
+
+
+@dataclass
+class DictEmployee:
+    """The representation Employee used before it switched to bitmasks."""
+    name: str
+    max_hours: int = 40
+    availability: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+    time_off: Set[str] = field(default_factory=set)
+    id: int = 0
+    assigned_hours: int = 0
+
+
+def build(cls, records):
+    employees = []
+    for i, rec in enumerate(records, start=1):
+        emp = cls(name=rec.name, max_hours=rec.max_hours, id=i)
+        for d in rec.days:
+            emp.availability[d].update(rec.shifts)
+        emp.time_off.update(rec.time_off)
+        employees.append(emp)
+    return employees
+
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = generate_roster(size)
+    # names are shared by both layouts, so only the structures are measured
+    for cls in (DictEmployee, Employee):
+        employees, used, elapsed = measure(lambda: build(cls, records))
+        print(f"{cls.__name__:>12}: {used / size:7.1f} bytes/employee, "
+              f"{used / 2**20:7.1f} MiB total, built in {elapsed:.2f}s")
+        del employees
+
+    employees = build(Employee, records)
+
+    def index():
+        registry = EmployeeRegistry()
+        for emp in employees:
+            registry.add(emp)
+        return registry
+    registry, used, elapsed = measure(index)
+    print(f"{'registry':>12}: {used / size:7.1f} bytes/employee, indexed in {elapsed:.2f}s")
+    if _optional('numpy') is not None:
+        _, _, elapsed = measure(registry.eligibility_matrix)
+        print(f"{'matrix':>12}: built in {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
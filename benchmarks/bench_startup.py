@@ -0,0 +1,90 @@
+"""Time from launching the web app to its first responses.
+
+Starts app.py in a subprocess on a generated roster, with and without
+FAST_START, and records when /healthz first answers, when it reports ready
+and when the schedule page is first served. Each mode runs on a fresh data
+directory (cold) and again on the same one (warm restart).
+
+Usage: python benchmarks/bench_startup.py [--employees 2000] [--modes 1,0]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from roster import ROOT, generate_roster, write_excel
+
+SERVER = "import app; app.app.run(port={port}, use_reloader=False)"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=120) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def run(data_dir: str, fast_start: str, timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ, DATA_DIR=data_dir, ROSTER_DB=os.path.join(data_dir, 'roster.db'),
+               FAST_START=fast_start)
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', SERVER.format(port=port)], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    marks = {}
+    try:
+        while 'ready_s' not in marks:
+            if time.perf_counter() - start > timeout or proc.poll() is not None:
+                raise RuntimeError("server did not become ready")
+            code = status(base + '/healthz')
+            now = time.perf_counter() - start
+            if code:
+                marks.setdefault('first_response_s', now)
+            if code == 200:
+                marks['ready_s'] = now
+            else:
+                time.sleep(0.01)
+        if status(base + '/') != 200:
+            raise RuntimeError("schedule page failed")
+        marks['first_page_s'] = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark web app start-up")
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--modes', default='1,0', help="FAST_START values to compare")
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+    records = generate_roster(args.employees)
+    for mode in args.modes.split(','):
+        data_dir = tempfile.mkdtemp(prefix='bench-startup-')
+        os.makedirs(os.path.join(data_dir, 'imports'))
+        write_excel(records, os.path.join(data_dir, 'imports', 'roster.xlsx'))
+        for start in ('cold', 'warm'):
+            row = {'fast_start': mode, 'start': start, 'employees': args.employees}
+            row.update(run(data_dir, mode, args.timeout))
+            print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
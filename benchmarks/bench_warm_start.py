@@ -0,0 +1,43 @@
+"""Compare cold and warm-started CP-SAT re-solves after a single roster edit.
+
+Usage: python benchmarks/bench_warm_start.py [employees ...]
+"""
+import sys
+import time
+
+from roster import build_scheduler, generate_roster
+
+from scheduler import DAYS, SHIFTS, Scheduler
+
+
+def timed(scheduler: Scheduler, incremental: bool):
+    start = time.perf_counter()
+    schedule = scheduler.generate_schedule(incremental=incremental)
+    return time.perf_counter() - start, schedule
+
+
+def moved(before, after) -> int:
+    return sum(before[d][s] != after[d][s] for d in DAYS for s in SHIFTS)
+
+
+def run(size: int):
+    records = generate_roster(size)
+    cold = build_scheduler(records)
+    warm = build_scheduler(records)
+    _, cold_before = timed(cold, incremental=False)
+    _, warm_before = timed(warm, incremental=True)
+
+    # one employee books a day off
+    emp_id = 1 + size // 2
+    for scheduler in (cold, warm):
+        scheduler.request_time_off(emp_id, 'Wed')
+    cold_time, cold_schedule = timed(cold, incremental=False)
+    warm_time, warm_schedule = timed(warm, incremental=True)
+    print(f"{size:>6} employees  cold {cold_time:8.3f}s ({moved(cold_before, cold_schedule):2d} moved)"
+          f"  warm {warm_time:8.3f}s ({moved(warm_before, warm_schedule):2d} moved)")
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [50, 200, 1000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,106 @@
+"""Seeded synthetic rosters for the benchmarks.
+
+Rosters are produced as ImportRecords so the same data can be loaded straight
+into a Scheduler or written out as an Excel or PDF upload.
+"""
+import os
+import random
+import sys
+import tempfile
+from typing import List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scheduler import DAYS, SHIFTS, ImportRecord, Scheduler  # noqa: E402
+
+MAX_HOURS_MIX = (16, 24, 32, 40)
+
+
+def generate_roster(employees: int, density: float = 0.4, time_off_rate: float = 0.1,
+                    max_hours_mix: Sequence[int] = MAX_HOURS_MIX,
+                    seed: int = 0, profiles: Optional[int] = None,
+                    roles: Sequence[str] = ()) -> List[ImportRecord]:
+    """Random roster of ``employees`` records.
+
+    ``density`` is the chance an employee works a given day; each working day
+    gets one to three shifts. Each employee books one day off with probability
+    ``time_off_rate``. With ``profiles`` every employee copies one of that many
+    random (availability, time off, max hours) profiles, so the roster is full
+    of interchangeable people. ``roles`` gives each employee one of them.
+    Records use the importer's shape (days x shifts), so they round-trip
+    through the Excel and PDF writers.
+    """
+    rng = random.Random(seed)
+
+    def profile():
+        days = [d for d in DAYS if rng.random() < density]
+        shifts = rng.sample(SHIFTS, rng.randint(1, len(SHIFTS)))
+        time_off = [rng.choice(DAYS)] if rng.random() < time_off_rate else []
+        return days, shifts, time_off, rng.choice(max_hours_mix), rng.choice(roles) if roles else ''
+
+    pool = [profile() for _ in range(profiles)] if profiles else None
+    records = []
+    for i in range(employees):
+        days, shifts, time_off, max_hours, role = rng.choice(pool) if pool else profile()
+        records.append(ImportRecord(name=f"Employee {i:06d}", max_hours=max_hours,
+                                    days=list(days), shifts=list(shifts),
+                                    time_off=list(time_off), row=i + 2, role=role))
+    return records
+
+
+def build_scheduler(records: List[ImportRecord], **kwargs) -> Scheduler:
+    """Scheduler on an empty data directory holding exactly ``records``."""
+    scheduler = Scheduler(data_dir=tempfile.mkdtemp(prefix='bench-'), **kwargs)
+    scheduler.apply_records(records)
+    return scheduler
+
+
+def write_excel(records: List[ImportRecord], path: str):
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Name', 'MaxHours', 'Days', 'Shifts', 'TimeOff', 'Role'])
+    for rec in records:
+        ws.append([rec.name, rec.max_hours, ', '.join(rec.days), ', '.join(rec.shifts),
+                   ', '.join(rec.time_off), rec.role])
+    wb.save(path)
+
+
+def write_pdf(records: List[ImportRecord], path: str, lines_per_page: int = 60):
+    """Minimal text-only PDF with one importer line per employee."""
+    lines = [', '.join([rec.name, str(rec.max_hours), ' '.join(rec.days),
+                        ' '.join(rec.shifts), ' '.join(rec.time_off)] + ([rec.role] if rec.role else []))
+             for rec in records]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    # objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    kids = ' '.join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, page in enumerate(pages):
+        text = ' '.join(f"({escape(line)}) Tj T*" for line in page)
+        stream = f"BT /F1 9 Tf 11 TL 36 806 Td {text} ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n").encode()
+    with open(path, 'wb') as f:
+        f.write(out)
@@ -0,0 +1,161 @@
+"""Scheduler benchmark suite.
+
+Runs the CP-SAT, heuristic and random schedulers and the Excel and PDF
+importers on seeded synthetic rosters and writes one JSON object per case and
+roster size: wall time, peak Python memory, process peak RSS, and the coverage
+and hour balance of the resulting schedule.
+
+Usage: python benchmarks/run.py --sizes 100,1000 --cases cp_sat,heuristic --output results.jsonl
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from roster import build_scheduler, generate_roster, write_excel, write_pdf
+
+from scheduler import ALL_SLOTS, DAYS, SHIFT_HOURS, SHIFTS, Scheduler
+
+
+def empty_schedule():
+    return {d: {s: None for s in SHIFTS} for d in DAYS}
+
+
+def case_cp_sat(records, args):
+    scheduler = build_scheduler(records, time_limit=args.time_limit, num_workers=args.workers)
+    return lambda: scheduler._solve(scheduler._snapshot())
+
+
+def case_heuristic(records, args):
+    scheduler = build_scheduler(records)
+
+    def run():
+        return scheduler._heuristic_schedule(scheduler._snapshot(), empty_schedule())
+    return run
+
+
+def case_random(records, args):
+    scheduler = build_scheduler(records)
+
+    def run():
+        random.seed(args.seed)
+        return scheduler._random_schedule(scheduler._snapshot(), empty_schedule())
+    return run
+
+
+def _import_case(writer, ext):
+    def case(records, args):
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-'), f"roster{ext}")
+        writer(records, path)
+        scheduler = Scheduler(data_dir=tempfile.mkdtemp(prefix='bench-'),
+                              import_workers=args.import_workers)
+
+        def run():
+            scheduler.import_file(path)
+        return run
+    return case
+
+
+CASES = {
+    'cp_sat': case_cp_sat,
+    'heuristic': case_heuristic,
+    'random': case_random,
+    'import_excel': _import_case(write_excel, '.xlsx'),
+    'import_pdf': _import_case(write_pdf, '.pdf'),
+}
+
+
+def schedule_quality(schedule):
+    """Share of slots filled and how evenly hours are spread over assigned staff."""
+    if schedule is None:
+        return {}
+    names = [schedule[d][s] for d, s in ALL_SLOTS]
+    hours = [n * SHIFT_HOURS for n in Counter(n for n in names if n).values()]
+    return {
+        'coverage': sum(1 for n in names if n) / len(names),
+        'assigned_employees': len(hours),
+        'hours_max': max(hours, default=0),
+        'hours_min': min(hours, default=0),
+        'hours_stdev': statistics.pstdev(hours) if hours else 0.0,
+    }
+
+
+def run_case(name, size, args):
+    records = generate_roster(size, density=args.density, time_off_rate=args.time_off_rate,
+                              seed=args.seed)
+    case = CASES[name]
+    times = []
+    result = None
+    for _ in range(args.repeat):
+        run = case(records, args)
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+
+    # memory is measured on a separate run since tracing slows Python down
+    run = case(records, args)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    row = {
+        'case': name,
+        'employees': size,
+        'density': args.density,
+        'time_off_rate': args.time_off_rate,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'wall_s': statistics.median(times),
+        'wall_min_s': min(times),
+        'peak_python_mb': peak / 2 ** 20,
+        # ru_maxrss is KiB on Linux; it is the process-wide high-water mark
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    row.update(schedule_quality(result))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler on synthetic rosters")
+    parser.add_argument('--sizes', default='100,1000',
+                        help="comma separated employee counts")
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help=f"comma separated subset of {', '.join(CASES)}")
+    parser.add_argument('--density', type=float, default=0.4)
+    parser.add_argument('--time-off-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--time-limit', type=float, default=30.0,
+                        help="CP-SAT time limit in seconds")
+    parser.add_argument('--workers', type=int, default=None, help="CP-SAT search workers")
+    parser.add_argument('--import-workers', type=int, default=None,
+                        help="processes used to parse imports")
+    parser.add_argument('--output', help="append JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    out = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for name in args.cases.split(','):
+            if name not in CASES:
+                parser.error(f"unknown case '{name}'")
+            for size in (int(n) for n in args.sizes.split(',')):
+                out.write(json.dumps(run_case(name, size, args)) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,148 @@
+import asyncio
+import io
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
 import discord
 from discord.ext import commands
 
 from scheduler import Scheduler, Employee
+from storage import SQLiteRosterStore
+import exporter
+
+logger = logging.getLogger(__name__)
+
+# prefix commands need to read message text
+intents = discord.Intents.default()
+intents.message_content = True
+bot = commands.Bot(command_prefix='!', intents=intents)
+
+# same roster database as the web app
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+ROSTER_DB = os.environ.get('ROSTER_DB', os.path.join(DATA_DIR, 'roster.db'))
+# CP-SAT limit so a large roster cannot tie up a solve thread indefinitely
+SOLVER_TIME_LIMIT = float(os.environ.get('SOLVER_TIME_LIMIT', 30))
+scheduler = Scheduler(data_dir=DATA_DIR, time_limit=SOLVER_TIME_LIMIT,
+                      store=SQLiteRosterStore(ROSTER_DB))
+# seconds without edits before the schedule is re-solved in the background
+RESOLVE_DELAY = float(os.environ.get('BOT_RESOLVE_DELAY', 2))
+
+# solves run here so the event loop keeps answering heartbeats
+solve_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bot-solve')
+# roster reloads and SQLite writes run here, one at a time and never behind a solve
+store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-store')
+# roster fingerprint -> solve in progress, shared by every caller waiting on it
+_solves: Dict[str, asyncio.Future] = {}
+_resolve_timer: Optional[asyncio.TimerHandle] = None
 
-bot = commands.Bot(command_prefix='!')
+@bot.before_invoke
+async def refresh_roster(ctx):
+    # pick up edits made through the web app
+    if await in_store(scheduler.refresh):
+        roster_changed()
 
-scheduler = Scheduler()
+async def in_store(func, *args):
+    """Run a call that reads or writes the roster database off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(store_executor, func, *args)
+
+async def solve_schedule():
+    """Schedule for the current roster, solved off the event loop.
+
+    Callers asking while the same roster is being solved wait for that solve
+    instead of starting another one.
+    """
+    key = scheduler.fingerprint()
+    solve = _solves.get(key)
+    if solve is None:
+        loop = asyncio.get_running_loop()
+        solve = _solves[key] = loop.run_in_executor(solve_executor, scheduler.generate_schedule)
+        solve.add_done_callback(lambda _: _solves.pop(key, None))
+    # one impatient caller must not cancel the solve for the others
+    return await asyncio.shield(solve)
+
+async def _resolve():
+    try:
+        await solve_schedule()
+    except Exception:
+        logger.exception("Background re-solve failed")
+
+def roster_changed():
+    """Re-solve once edits stop arriving, so a burst of them costs one solve."""
+    global _resolve_timer
+    if _resolve_timer is not None:
+        _resolve_timer.cancel()
+    _resolve_timer = asyncio.get_running_loop().call_later(
+        RESOLVE_DELAY, lambda: asyncio.ensure_future(_resolve()))
+
+def resolve_employee(ref: str):
+    """Look up an employee by id or by name."""
+    emp = scheduler.registry.get(int(ref)) if ref.isdigit() else scheduler.find_employee(ref)
+    if emp is None:
+        raise ValueError('Employee not found')
+    return emp
 
 @bot.command(name='add_employee')
-async def add_employee(ctx, name: str, max_hours: int = 40):
-    scheduler.add_employee(Employee(name=name, max_hours=max_hours))
-    await ctx.send(f"Added employee {name} with max {max_hours}h/week.")
+async def add_employee(ctx, name: str, max_hours: int = 40, role: str = ''):
+    await in_store(scheduler.add_employee, Employee(name=name, max_hours=max_hours, role=role))
+    roster_changed()
+    await ctx.send(f"Added employee {name} with max {max_hours}h/week"
+                   + (f" as {role}." if role else "."))
 
 @bot.command(name='availability')
-async def availability(ctx, emp_id: int, days: str, shifts: str):
+async def availability(ctx, employee: str, days: str, shifts: str):
     day_list = [d.strip() for d in days.split(',') if d.strip()]
     shift_list = [s.strip() for s in shifts.split(',') if s.strip()]
     try:
-        scheduler.update_availability(emp_id, day_list, shift_list)
+        await in_store(scheduler.update_availability, resolve_employee(employee).id,
+                       day_list, shift_list)
+        roster_changed()
         await ctx.send("Availability updated.")
     except ValueError as e:
         await ctx.send(str(e))
 
 @bot.command(name='time_off')
-async def time_off(ctx, emp_id: int, day: str):
+async def time_off(ctx, employee: str, day: str):
     try:
-        scheduler.request_time_off(emp_id, day)
+        await in_store(scheduler.request_time_off, resolve_employee(employee).id, day)
+        roster_changed()
         await ctx.send("Time off recorded.")
     except ValueError as e:
         await ctx.send(str(e))
 
 @bot.command(name='schedule')
 async def show_schedule(ctx):
-    schedule = scheduler.generate_schedule()
+    async with ctx.typing():
+        schedule = await solve_schedule()
     lines = []
     for day, shifts in schedule.items():
         shift_str = ', '.join(f"{s}: {shifts[s] or '-'}" for s in ['morning','evening','night'])
         lines.append(f"{day}: {shift_str}")
     await ctx.send('```\n' + '\n'.join(lines) + '\n```')
 
+@bot.command(name='export')
+async def export_schedule(ctx, fmt: str = 'csv', *, employee: Optional[str] = None):
+    if fmt not in exporter.FORMATS:
+        await ctx.send(f"Format must be one of: {', '.join(exporter.FORMATS)}")
+        return
+    try:
+        name = resolve_employee(employee).name if employee else None
+    except ValueError as e:
+        await ctx.send(str(e))
+        return
+    async with ctx.typing():
+        schedule = await solve_schedule()
+        data = await asyncio.get_running_loop().run_in_executor(
+            solve_executor, lambda: b''.join(exporter.export(schedule, fmt, employee=name)))
+    await ctx.send(file=discord.File(io.BytesIO(data), filename=exporter.filename(fmt, employee=name)))
+
 @bot.command(name='employees')
 async def list_employees(ctx):
-    if not scheduler.employees:
+    if not scheduler.registry:
         await ctx.send("No employees.")
         return
-    lines = [f"{e.id}: {e.name} ({e.max_hours}h)" for e in scheduler.employees]
+    lines = [f"{e.id}: {e.name} ({e.max_hours}h)" for e in scheduler.registry]
     await ctx.send('```\n' + '\n'.join(lines) + '\n```')
 
 if __name__ == '__main__':
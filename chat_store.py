@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+SNAPSHOT_VERSION = 2
+DEFAULT_STATE = {"state": "ask_roles", "roles": {}}
+
+
+class ChatStateStore:
+    """Per-session chat state kept as a snapshot plus an append-only journal.
+
+    Every update appends one short JSON line to the journal, so the cost of a
+    message does not depend on how much state has accumulated. Every
+    ``compact_every`` updates the sessions are written to a new snapshot,
+    swapped in atomically, and the journal starts over. A torn final journal
+    line from a crash is ignored on load and the journal is rewritten, so
+    later updates are not appended after it; replaying updates is idempotent.
+    """
+    def __init__(self, path: str, compact_every: int = 500,
+                 max_idle: Optional[float] = 30 * 24 * 3600):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.compact_every = compact_every
+        # sessions idle longer than this (seconds) are dropped on compaction
+        self.max_idle = max_idle
+        self.sessions: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._journal = None
+        self._pending = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._load()
+
+    def get(self, session_id: str) -> dict:
+        """Copy of a session's state, with defaults for a new session."""
+        with self._lock:
+            state = dict(DEFAULT_STATE)
+            state.update(self.sessions.get(session_id, {}))
+            return state
+
+    def update(self, session_id: str, **fields):
+        """Set ``fields`` on a session and journal the change."""
+        fields["updated"] = time.time()
+        line = json.dumps({"s": session_id, "u": fields}, separators=(",", ":"))
+        with self._lock:
+            self.sessions.setdefault(session_id, {}).update(fields)
+            self._journal.write(line + "\n")
+            self._journal.flush()
+            self._pending += 1
+            if self._pending >= self.compact_every:
+                self._compact()
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if "sessions" in data:
+            self.sessions = data["sessions"]
+        elif "state" in data:
+            # single-conversation file from before sessions existed
+            self.sessions = {"default": {"state": data["state"], "roles": data.get("roles", {})}}
+        # False once the journal holds a torn write; appending after it would
+        # glue new lines onto the garbage, so it must be rewritten
+        clean = True
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # incomplete write, nothing valid can follow it
+                        clean = False
+                        break
+                    self.sessions.setdefault(entry["s"], {}).update(entry["u"])
+                    self._pending += 1
+                    if not line.endswith("\n"):
+                        clean = False
+        except OSError:
+            pass
+        if self._pending or not clean or "sessions" not in data:
+            self._compact()
+        else:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _compact(self):
+        if self.max_idle is not None:
+            cutoff = time.time() - self.max_idle
+            self.sessions = {sid: s for sid, s in self.sessions.items()
+                             if s.get("updated", cutoff) >= cutoff}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "sessions": self.sessions}, f,
+                      separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # the snapshot now holds everything the journal did
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._pending = 0
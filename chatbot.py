@@ -1,34 +1,36 @@
 import os
-import json
 from typing import Dict, List
 import requests
-from scheduler import Scheduler, Employee
+from requests.adapters import HTTPAdapter
+from scheduler import Scheduler, Employee, demand_from_roles
 from ai_engine import AIEngine
+from answer_cache import AnswerCache
+from chat_store import ChatStateStore
+
+# point at a local stand-in to develop or test without internet access
+SEARCH_URL = os.environ.get("SEARCH_URL", "https://api.duckduckgo.com/")
+# (connect, read) seconds
+SEARCH_TIMEOUT = (3.05, float(os.environ.get("SEARCH_TIMEOUT", 5)))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 512))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", 3600))
 
 class ChatBot:
-    """Very simple stateful chatbot for gathering schedule info."""
+    """Very simple stateful chatbot for gathering schedule info.
+
+    Each chat session (one per browser) has its own conversation state.
+    """
     def __init__(self, scheduler: Scheduler, data_dir: str = "data"):
         self.scheduler = scheduler
         self.ai = AIEngine()
-        self.data_file = os.path.join(data_dir, "chat_state.json")
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                self.data = json.load(f)
-        else:
-            self.data = {
-                "state": "ask_roles",
-                "roles": {},
-                "employees": [],
-            }
-            self._save()
+        self.store = ChatStateStore(os.path.join(data_dir, "chat_state.json"))
+        self.answers = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL)
+        # keep-alive connections reused across searches and request threads
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
 
-    def _save(self):
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        with open(self.data_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
-
-    def handle_message(self, msg: str) -> str:
-        state = self.data.get("state", "ask_roles")
+    def handle_message(self, msg: str, session_id: str = "default") -> str:
+        state = self.store.get(session_id)["state"]
         text = msg.strip()
 
         # allow user to ask arbitrary questions starting with 'search' or ending with '?'
@@ -39,10 +41,8 @@ class ChatBot:
         if text.endswith('?') and state == 'done':
             return self._answer_question(text)
         if state == "ask_roles":
-            self.data["roles"] = self._parse_roles(msg)
-            self.data["state"] = "ask_employees"
-            self._save()
-            return "Thanks. Now list employees as 'Name, MaxHours'. One per line."
+            self.store.update(session_id, roles=self._parse_roles(msg), state="ask_employees")
+            return "Thanks. Now list employees as 'Name, MaxHours, Role'. One per line."
         elif state == "ask_employees":
             for line in msg.splitlines():
                 parts = [p.strip() for p in line.split(',')]
@@ -50,11 +50,9 @@ class ChatBot:
                     continue
                 name = parts[0]
                 max_hours = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 40
-                emp = Employee(name=name, max_hours=max_hours)
-                self.scheduler.add_employee(emp)
-                self.data.setdefault("employees", []).append({"id": emp.id, "name": name, "max_hours": max_hours})
-            self.data["state"] = "ask_availability"
-            self._save()
+                role = parts[2] if len(parts) > 2 else ''
+                self.scheduler.add_employee(Employee(name=name, max_hours=max_hours, role=role))
+            self.store.update(session_id, state="ask_availability")
             return "Great! Provide availability like 'Name: Mon morning, Tue evening'."
         elif state == "ask_availability":
             for line in msg.splitlines():
@@ -75,8 +73,7 @@ class ChatBot:
                     if len(parts) > 1:
                         shifts.extend(parts[1:])
                 self.scheduler.update_availability(emp.id, days, shifts)
-            self.data["state"] = "ask_timeoff"
-            self._save()
+            self.store.update(session_id, state="ask_timeoff")
             return "Any time-off requests? Use 'Name: Fri'. If none, just reply 'none'."
         elif state == "ask_timeoff":
             if msg.strip().lower() != 'none':
@@ -89,22 +86,19 @@ class ChatBot:
                         continue
                     for day in rest.split():
                         self.scheduler.request_time_off(emp.id, day.strip())
-            schedule = self.scheduler.generate_schedule()
-            self.data["state"] = "done"
-            self._save()
-            return self._format_schedule(schedule)
+            self.store.update(session_id, state="done")
+            return self._format_schedule(self._schedule(session_id))
         else:
             # after setup, treat questions ending with '?' as AI queries
             if msg.strip().endswith('?'):
                 return self._answer_question(msg.strip())
-            schedule = self.scheduler.generate_schedule()
-            return self._format_schedule(schedule)
+            return self._format_schedule(self._schedule(session_id))
 
-    def get_prompt(self) -> str:
-        state = self.data.get("state", "ask_roles")
+    def get_prompt(self, session_id: str = "default") -> str:
+        state = self.store.get(session_id)["state"]
         prompts = {
             "ask_roles": "What roles are needed each day of the week? e.g. 'Mon: cook, manager'",
-            "ask_employees": "List employees as 'Name, MaxHours'",
+            "ask_employees": "List employees as 'Name, MaxHours, Role'",
             "ask_availability": "Provide availability like 'Name: Mon morning, Tue evening'",
             "ask_timeoff": "Any time-off requests? Use 'Name: Fri' or reply 'none'",
             "done": "Ask me a question or type anything to regenerate the schedule",
@@ -120,21 +114,36 @@ class ChatBot:
             roles[day.strip()] = [r.strip() for r in rest.split(',') if r.strip()]
         return roles
 
+    def _schedule(self, session_id: str) -> Dict[str, Dict[str, object]]:
+        """This week's schedule, staffed to the roles given at the start if any."""
+        demand = demand_from_roles(self.store.get(session_id).get("roles") or {})
+        if demand:
+            return self.scheduler.generate_horizon(1, demand).weeks[0]
+        return self.scheduler.generate_schedule()
+
     def _find_employee(self, name: str):
-        for emp in self.scheduler.employees:
-            if emp.name.lower() == name.lower():
-                return emp
-        return None
+        return self.scheduler.find_employee(name)
 
-    def _format_schedule(self, schedule: Dict[str, Dict[str, str]]) -> str:
+    def _format_schedule(self, schedule: Dict[str, Dict[str, object]]) -> str:
         lines = []
         for day, shifts in schedule.items():
-            parts = [f"{sh}:{shifts[sh] or '-'}" for sh in ['morning','evening','night']]
+            parts = []
+            for sh in ['morning','evening','night']:
+                # one name, or a list of them when staffed to roles
+                names = shifts[sh] if isinstance(shifts[sh], list) else [shifts[sh]]
+                parts.append(f"{sh}:{'/'.join(n for n in names if n) or '-'}")
             lines.append(f"{day}: " + ', '.join(parts))
         return "\n".join(lines)
 
     def _answer_question(self, query: str) -> str:
-        """Answer a question using OpenAI if configured, falling back to web search."""
+        """Answer a question, reusing recent answers to the same question."""
+        try:
+            return self.answers.get(query, self._lookup)
+        except Exception:
+            return "Sorry, I couldn't search the web right now."
+
+    def _lookup(self, query: str) -> str:
+        """Answer using OpenAI if configured, falling back to web search."""
         if self.ai.available:
             try:
                 return self.ai.ask(query)
@@ -144,20 +153,18 @@ class ChatBot:
 
     def _search_web(self, query: str) -> str:
         """Use DuckDuckGo Instant Answer API for simple web search."""
-        try:
-            resp = requests.get(
-                "https://api.duckduckgo.com/",
-                params={"q": query, "format": "json", "t": "auto-scheduler"},
-                timeout=5,
-            )
-            data = resp.json()
-            if data.get("AbstractText"):
-                return data["AbstractText"]
-            elif data.get("RelatedTopics"):
-                # grab text from first related topic
-                for topic in data["RelatedTopics"]:
-                    if isinstance(topic, dict) and topic.get("Text"):
-                        return topic["Text"]
-            return "No results found."
-        except Exception:
-            return "Sorry, I couldn't search the web right now."
\ No newline at end of file
+        resp = self.http.get(
+            SEARCH_URL,
+            params={"q": query, "format": "json", "t": "auto-scheduler"},
+            timeout=SEARCH_TIMEOUT,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("AbstractText"):
+            return data["AbstractText"]
+        elif data.get("RelatedTopics"):
+            # grab text from first related topic
+            for topic in data["RelatedTopics"]:
+                if isinstance(topic, dict) and topic.get("Text"):
+                    return topic["Text"]
+        return "No results found."
\ No newline at end of file
@@ -1,35 +1,272 @@
 import argparse
+import ast
+import os
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from ai_engine import AIEngine
 
+MODES = ("auto", "whole", "chunked")
+# in auto mode, files larger than this are edited chunk by chunk
+CHUNK_MIN_CHARS = 8000
+# files that are not Python are split into blocks of this many lines
+CHUNK_LINES = 80
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+class PatchError(ValueError):
+    """A diff returned by the model does not apply to the file."""
+
+
+class EditError(RuntimeError):
+    """One or more files could not be edited; none of them were written."""
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        super().__init__("; ".join(f"{path}: {e}" for path, e in errors.items()))
+
+
+@dataclass
+class Chunk:
+    """Lines ``start``..``end`` (1-based, inclusive) of a file."""
+    start: int
+    end: int
+    text: str
+    # name of the top-level function or class, None for other statements
+    name: Optional[str] = None
+
+
+def split_chunks(source: str) -> List[Chunk]:
+    """Split a file into top-level definitions and the statements between them.
+
+    Comments and blank lines belong to the chunk that follows them. Files
+    that do not parse as Python are cut into fixed blocks of lines.
+    """
+    lines = source.splitlines(keepends=True)
+    try:
+        body = ast.parse(source).body
+    except SyntaxError:
+        return [Chunk(i + 1, min(i + CHUNK_LINES, len(lines)), "".join(lines[i:i + CHUNK_LINES]))
+                for i in range(0, len(lines), CHUNK_LINES)]
+    spans = []
+    for node in body:
+        name = node.name if isinstance(
+            node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) else None
+        if spans and name is None and spans[-1][1] is None:
+            # consecutive plain statements (imports, constants) stay together
+            spans[-1][0] = node.end_lineno
+        else:
+            spans.append([node.end_lineno, name])
+    chunks = []
+    start = 1
+    for i, (end, name) in enumerate(spans):
+        if i == len(spans) - 1:
+            end = len(lines)
+        chunks.append(Chunk(start, end, "".join(lines[start - 1:end]), name))
+        start = end + 1
+    return chunks
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    """Apply a single-file unified diff, tolerating hunks whose line numbers drifted."""
+    lines = original.splitlines(keepends=True)
+    out = []
+    pos = 0
+    for start, old, new in _parse_hunks(diff):
+        at = _locate(lines, old, start - 1, pos)
+        out.extend(lines[pos:at])
+        out.extend(line + "\n" for line in new)
+        pos = at + len(old)
+    out.extend(lines[pos:])
+    return "".join(out)
+
+
+def _parse_hunks(diff: str) -> List[Tuple[int, List[str], List[str]]]:
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith("\\"):
+            # file headers come before the first hunk; inside one, "--- x" removes "-- x"
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            # context; models often drop the leading space on blank lines
+            current[1].append(line[1:])
+            current[2].append(line[1:])
+    if not hunks:
+        raise PatchError("No diff hunks in the response")
+    return hunks
+
+
+def _locate(lines: List[str], old: List[str], hint: int, floor: int) -> int:
+    """Index at which ``old`` occurs in ``lines``, searching outward from ``hint``."""
+    if not old:
+        return min(max(hint + 1, floor), len(lines))
+    want = [line.rstrip() for line in old]
+    for offset in range(len(lines) + 1):
+        for at in (hint + offset, hint - offset):
+            if floor <= at <= len(lines) - len(old) and \
+                    [line.rstrip() for line in lines[at:at + len(old)]] == want:
+                return at
+    raise PatchError(f"Hunk at line {hint + 1} does not match the file")
+
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
+
+def _atomic_write(path: str, text: str):
+    """Replace ``path`` so readers see either the old or the new content."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
 class AICodeEditor:
-    """AI-powered code editor that applies changes to a file."""
-    def __init__(self, engine: AIEngine | None = None):
+    """AI-powered code editor that applies changes to files.
+
+    Small files are rewritten whole. Large ones are split into top-level
+    chunks; only the chunks relevant to the instruction are sent and the
+    model answers with a unified diff.
+    """
+    def __init__(self, engine: AIEngine | None = None, max_prompt_chars: int = 12000):
         self.engine = engine or AIEngine()
+        # budget for the chunks sent in one chunked prompt
+        self.max_prompt_chars = max_prompt_chars
 
-    def apply_edit(self, path: str, instruction: str) -> str:
+    def apply_edit(self, path: str, instruction: str, mode: str = "auto") -> str:
         """Use the AI engine to rewrite a file according to an instruction."""
+        return self.edit_files([path], instruction, mode)[path]
+
+    def edit_files(self, paths: List[str], instruction: str, mode: str = "auto",
+                   max_workers: int = 4) -> Dict[str, str]:
+        """Edit several files concurrently and return their new content.
+
+        Every file is edited before any is written; if one fails nothing is
+        written, and if a write fails the files already replaced are restored.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}'")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as pool:
+            futures = {path: pool.submit(self._edit, path, instruction, mode) for path in paths}
+        edits, errors = {}, {}
+        for path, future in futures.items():
+            try:
+                edits[path] = future.result()
+            except Exception as e:
+                errors[path] = e
+        if errors:
+            raise EditError(errors)
+        written = []
+        try:
+            for path, (original, updated) in edits.items():
+                if updated != original:
+                    _atomic_write(path, updated)
+                    written.append((path, original))
+        except BaseException:
+            for path, original in reversed(written):
+                _atomic_write(path, original)
+            raise
+        return {path: updated for path, (_, updated) in edits.items()}
+
+    def _edit(self, path: str, instruction: str, mode: str) -> Tuple[str, str]:
+        """(original, updated) content of one file; nothing is written."""
         with open(path, "r", encoding="utf-8") as f:
             original = f.read()
+        if mode == "whole" or (mode == "auto" and len(original) <= CHUNK_MIN_CHARS):
+            return original, self._rewrite(original, instruction)
+        return original, self._edit_chunks(path, original, instruction)
+
+    def _rewrite(self, original: str, instruction: str) -> str:
         prompt = (
             "You are a helpful coding assistant. "
             "Edit the following file according to the instruction. "
-            "Return ONLY the updated file content.\n" 
-            f"Instruction:\n{instruction}\n" 
+            "Return ONLY the updated file content.\n"
+            f"Instruction:\n{instruction}\n"
             "Current file:\n" + original
         )
-        updated = self.engine.ask(prompt)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(updated)
-        return updated
+        return self.engine.ask(prompt)
+
+    def _edit_chunks(self, path: str, original: str, instruction: str) -> str:
+        chunks = self._relevant_chunks(split_chunks(original), instruction)
+        excerpts = "".join(f"# lines {c.start}-{c.end}\n{c.text}" for c in chunks)
+        prompt = (
+            "You are a helpful coding assistant. "
+            f"Edit the file {os.path.basename(path)} according to the instruction. "
+            "Only the excerpts below are shown; their line numbers are the file's own. "
+            "Return ONLY a unified diff against the file with @@ hunk headers.\n"
+            f"Instruction:\n{instruction}\n"
+            "Excerpts:\n" + excerpts
+        )
+        return apply_unified_diff(original, _strip_fences(self.engine.ask(prompt)))
+
+    def _relevant_chunks(self, chunks: List[Chunk], instruction: str) -> List[Chunk]:
+        """Chunks to show for ``instruction``, in file order.
+
+        Definitions named in the instruction win; otherwise chunks sharing the
+        most identifiers with it are taken until the prompt budget is spent.
+        The module header (imports, constants) is always included.
+        """
+        words = {w.lower() for w in IDENTIFIER.findall(instruction)}
+        header = chunks[:1] if chunks and chunks[0].name is None else []
+        picked = [c for c in chunks if c.name and c.name.lower() in words]
+        if not picked:
+            def score(chunk):
+                return len(words & {w.lower() for w in IDENTIFIER.findall(chunk.text)})
+            budget = self.max_prompt_chars - sum(len(c.text) for c in header)
+            for chunk in sorted(chunks, key=score, reverse=True):
+                if chunk in header or score(chunk) == 0:
+                    continue
+                if len(chunk.text) > budget and picked:
+                    break
+                picked.append(chunk)
+                budget -= len(chunk.text)
+        unique = {c.start: c for c in header + picked}
+        return [unique[start] for start in sorted(unique)]
+
 
 def main():
-    parser = argparse.ArgumentParser(description="Edit a code file with AI")
-    parser.add_argument("file")
+    parser = argparse.ArgumentParser(description="Edit code files with AI")
+    parser.add_argument("files", nargs="+", metavar="file")
     parser.add_argument("instruction")
+    parser.add_argument("--mode", choices=MODES, default="auto",
+                        help="rewrite files whole, send only relevant chunks, "
+                             f"or chunk files over {CHUNK_MIN_CHARS} characters (default)")
+    parser.add_argument("--workers", type=int, default=4, help="files edited at once")
     args = parser.parse_args()
     editor = AICodeEditor()
-    editor.apply_edit(args.file, args.instruction)
-    print(f"Updated {args.file} using AI")
+    try:
+        editor.edit_files(args.files, args.instruction, args.mode, args.workers)
+    except EditError as e:
+        for path, error in e.errors.items():
+            print(f"Failed to edit {path}: {error}", file=sys.stderr)
+        raise SystemExit(1)
+    for path in args.files:
+        print(f"Updated {path} using AI")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,148 @@
+"""Stream schedules as CSV, XLSX or iCalendar.
+
+Every exporter is a generator of ``bytes`` chunks produced row by row, so a
+response can start before the whole document exists. A schedule is one week
+(day -> shift -> name) or a list of consecutive weeks, whose shifts may hold
+a list of names when several people work them.
+"""
+import csv
+import io
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from scheduler import DAYS, SHIFTS, SHIFT_HOURS
+
+# local start time of each shift; SHIFT_HOURS later it ends
+SHIFT_STARTS = {'morning': time(6), 'evening': time(14), 'night': time(22)}
+COLUMNS = ['date', 'day', 'shift', 'start', 'end', 'employee', 'hours']
+CHUNK_SIZE = 64 * 1024
+
+Week = Dict[str, Dict[str, Union[None, str, List[str]]]]
+Schedule = Union[Week, List[Week]]
+
+
+def next_monday(today: Optional[date] = None) -> date:
+    """First day of the week a schedule is usually made for: today if Monday."""
+    today = today or date.today()
+    return today + timedelta(days=-today.weekday() % 7)
+
+
+def iter_shifts(schedule: Schedule, week_start: date,
+                employee: Optional[str] = None) -> Iterator[Tuple[date, str, str, datetime, datetime, str]]:
+    """(date, day, shift, start, end, employee) for every filled shift, in order."""
+    weeks = [schedule] if isinstance(schedule, dict) else schedule
+    for week, shifts_by_day in enumerate(weeks):
+        for offset, day in enumerate(DAYS):
+            shifts = shifts_by_day.get(day, {})
+            for shift in SHIFTS:
+                names = shifts.get(shift) or []
+                when = week_start + timedelta(days=7 * week + offset)
+                start = datetime.combine(when, SHIFT_STARTS[shift])
+                for name in [names] if isinstance(names, str) else names:
+                    if employee is None or name == employee:
+                        yield when, day, shift, start, start + timedelta(hours=SHIFT_HOURS), name
+
+
+def export_csv(schedule: Schedule, week_start: date,
+               employee: Optional[str] = None) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for when, day, shift, start, end, name in iter_shifts(schedule, week_start, employee):
+        writer.writerow([when.isoformat(), day, shift, start.isoformat(timespec='minutes'),
+                         end.isoformat(timespec='minutes'), name, SHIFT_HOURS])
+        yield buf.getvalue().encode('utf-8')
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        # header only: no shifts matched
+        yield buf.getvalue().encode('utf-8')
+
+
+def export_xlsx(schedule: Schedule, week_start: date,
+                employee: Optional[str] = None) -> Iterator[bytes]:
+    """Write-only workbook saved to a temporary file, then streamed in chunks."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Schedule')
+    ws.append(COLUMNS)
+    for when, day, shift, start, end, name in iter_shifts(schedule, week_start, employee):
+        ws.append([when, day, shift, start, end, name, SHIFT_HOURS])
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        wb.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def _ics_text(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def _ics_line(line: str) -> bytes:
+    """Fold to 75 octets per line as RFC 5545 requires."""
+    data = line.encode('utf-8')
+    parts = []
+    limit = 75
+    while len(data) > limit:
+        cut = limit
+        # never split a UTF-8 sequence
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+        # continuation lines start with a space, which counts towards their 75
+        limit = 74
+    parts.append(data)
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def export_ics(schedule: Schedule, week_start: date,
+               employee: Optional[str] = None) -> Iterator[bytes]:
+    """One VEVENT per shift; with ``employee`` a personal feed of their shifts."""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    name = f"Shifts: {employee}" if employee else "Shift schedule"
+    for line in ('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Auto-Schedule//Schedule Export//EN',
+                 'CALSCALE:GREGORIAN', f'X-WR-CALNAME:{_ics_text(name)}'):
+        yield _ics_line(line)
+    for when, day, shift, start, end, who in iter_shifts(schedule, week_start, employee):
+        uid = f"{when:%Y%m%d}-{shift}-{who}".replace(' ', '_')
+        summary = f"{shift.title()} shift" if employee else f"{shift.title()} shift: {who}"
+        for line in ('BEGIN:VEVENT', f'UID:{_ics_text(uid)}@auto-schedule', f'DTSTAMP:{stamp}',
+                     f'DTSTART:{start:%Y%m%dT%H%M%S}', f'DTEND:{end:%Y%m%dT%H%M%S}',
+                     f'SUMMARY:{_ics_text(summary)}', f'DESCRIPTION:{_ics_text(who)}',
+                     'END:VEVENT'):
+            yield _ics_line(line)
+    yield _ics_line('END:VCALENDAR')
+
+
+# format -> (exporter, mimetype, file extension)
+FORMATS = {
+    'csv': (export_csv, 'text/csv', 'csv'),
+    'xlsx': (export_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'ics': (export_ics, 'text/calendar', 'ics'),
+}
+
+
+def export(schedule: Schedule, fmt: str, week_start: Optional[date] = None,
+           employee: Optional[str] = None) -> Iterator[bytes]:
+    """Chunks of ``schedule`` in ``fmt``; raises ValueError for unknown formats."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    return FORMATS[fmt][0](schedule, week_start or next_monday(), employee)
+
+
+def filename(fmt: str, week_start: Optional[date] = None, employee: Optional[str] = None) -> str:
+    week_start = week_start or next_monday()
+    who = f"-{'_'.join(employee.split())}" if employee else ''
+    return f"schedule-{week_start.isoformat()}{who}.{FORMATS[fmt][2]}"
@@ -0,0 +1,111 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from scheduler import Scheduler
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+METHODS = ('ai', 'incremental', 'random')
+
+
+@dataclass
+class SolveJob:
+    id: str
+    method: str
+    time_limit: Optional[float] = None
+    num_workers: Optional[int] = None
+    status: str = PENDING
+    schedule: Optional[Dict[str, Dict[str, str]]] = None
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'method': self.method,
+            'status': self.status,
+            'time_limit': self.time_limit,
+            'num_workers': self.num_workers,
+            'schedule': self.schedule,
+            'error': self.error,
+            'submitted': self.submitted,
+            'finished': self.finished,
+        }
+
+
+class SolveJobQueue:
+    """Runs schedule solves on a worker pool so request threads never block on CP-SAT."""
+    def __init__(self, scheduler: Scheduler, max_workers: int = 1,
+                 time_limit: Optional[float] = None, num_workers: Optional[int] = None,
+                 keep_finished: int = 100):
+        self.scheduler = scheduler
+        self.time_limit = time_limit
+        self.num_workers = num_workers
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='solve-job')
+        self._jobs: "OrderedDict[str, SolveJob]" = OrderedDict()
+        # (fingerprint, method, limits) -> id of the pending/running job
+        self._active: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, method: str = 'ai', time_limit: Optional[float] = None,
+               num_workers: Optional[int] = None) -> SolveJob:
+        """Queue a solve, or return the identical one that is still pending."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}'")
+        if time_limit is None:
+            time_limit = self.time_limit
+        if num_workers is None:
+            num_workers = self.num_workers
+        key = (self.scheduler.fingerprint(), method, time_limit, num_workers)
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return self._jobs[job_id]
+            job = SolveJob(id=uuid.uuid4().hex, method=method,
+                           time_limit=time_limit, num_workers=num_workers)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+            self._prune()
+        self._executor.submit(self._run, job, key)
+        return job
+
+    def get(self, job_id: str) -> Optional[SolveJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: SolveJob, key: Tuple):
+        job.status = RUNNING
+        try:
+            job.schedule = self.scheduler.generate_schedule(
+                randomize=job.method == 'random',
+                incremental=job.method == 'incremental',
+                time_limit=job.time_limit,
+                num_workers=job.num_workers,
+            )
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._active.pop(key, None)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond ``keep_finished``."""
+        finished = [jid for jid, job in self._jobs.items() if job.finished is not None]
+        for jid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[jid]
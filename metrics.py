@@ -0,0 +1,78 @@
+import threading
+from typing import Dict, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """Process-wide counters, gauges and summaries in Prometheus text format.
+
+    Summaries only track ``_count`` and ``_sum``; quantiles are left to the
+    Prometheus server.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[Labels, list]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        """Declare a metric; ``kind`` is counter, gauge or summary."""
+        with self._lock:
+            self._meta[name] = (kind, help_text)
+            self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._slot(name, labels)[0] += value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._slot(name, labels)[0] = value
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            slot = self._slot(name, labels)
+            slot[0] += 1
+            slot[1] += value
+
+    def _slot(self, name: str, labels: dict) -> list:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        return self._values[name].setdefault(key, [0, 0.0])
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, (value, total) in self._values[name].items():
+                    if kind == 'summary':
+                        lines.append(f"{name}_count{_labels(labels)} {value}")
+                        lines.append(f"{name}_sum{_labels(labels)} {total}")
+                    else:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    def escape(v):
+        return v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels) + '}'
+
+
+METRICS = Metrics()
+METRICS.describe('schedule_requests_total', 'counter',
+                 'generate_schedule calls by method and cache outcome.')
+METRICS.describe('schedule_phase_seconds', 'summary',
+                 'Time spent per scheduling phase (build, solve, extract, heuristic, random).')
+METRICS.describe('schedule_solver_status_total', 'counter', 'CP-SAT solves by final status.')
+METRICS.describe('schedule_solver_objective', 'gauge', 'Objective value of the last CP-SAT solve.')
+METRICS.describe('schedule_solver_variables', 'gauge', 'Boolean variables in the last CP-SAT model.')
+METRICS.describe('schedule_solver_conflicts_total', 'counter', 'CP-SAT conflicts across solves.')
+METRICS.describe('schedule_solver_branches_total', 'counter', 'CP-SAT branches across solves.')
+METRICS.describe('import_seconds', 'summary', 'import_file time by file format and phase.')
+METRICS.describe('import_rows_total', 'counter', 'Imported rows by file format and outcome.')
+METRICS.describe('chat_answer_cache_total', 'counter',
+                 'Chatbot answer lookups by cache outcome (hit, miss, shared).')
@@ -1,195 +1,1403 @@
+from bisect import bisect_left, insort
 from collections import defaultdict
-from dataclasses import dataclass, field
-from typing import Dict, List, Set
+from collections.abc import MutableMapping, MutableSet
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import copy
+import hashlib
+import heapq
+import importlib
+import json
+import logging
+import multiprocessing
 import os
 import random
-import pandas as pd
-import pdfplumber
+import threading
+import time
 
-try:
-    from ortools.sat.python import cp_model
-except ImportError:  # pragma: no cover - module may not be installed
-    cp_model = None
+from metrics import METRICS
+
+# heavy dependencies (OR-Tools, NumPy, openpyxl, pdfplumber) are imported on
+# first use so importing this module, and starting the app, stays fast
+CP_MODEL = 'ortools.sat.python.cp_model'
+_modules = {}
+
+
+def _optional(name: str):
+    """Import ``name`` on first use; None if it is not installed."""
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except ImportError:
+            _modules[name] = None
+    return _modules[name]
+
+
+@lru_cache(maxsize=None)
+def _solution_stream_class():
+    cp_model = _optional(CP_MODEL)
+
+    class _SolutionStream(cp_model.CpSolverSolutionCallback):
+        """Hands every improving CP-SAT solution to ``publish`` as a schedule.
+
+        The search stops once ``publish`` returns False.
+        """
+        def __init__(self, assign, roster, publish, expand):
+            super().__init__()
+            self._assign = assign
+            self._roster = roster
+            self._publish = publish
+            # maps the model's slot -> key solution to slot -> employee id
+            self._expand = expand
+            self.count = 0
+
+        def on_solution_callback(self):
+            self.count += 1
+            chosen = {(day, shift): key for (key, day, shift), var in self._assign.items()
+                      if self.Value(var)}
+            schedule = {d: {s: None for s in SHIFTS} for d in DAYS}
+            for (day, shift), eid in self._expand(chosen).items():
+                schedule[day][shift] = self._roster.get(eid).name
+            if self._publish({
+                'solution': self.count,
+                'schedule': schedule,
+                'objective': self.ObjectiveValue(),
+                'bound': self.BestObjectiveBound(),
+                'wall_time': self.WallTime(),
+            }) is False:
+                self.StopSearch()
+    return _SolutionStream
+
+logger = logging.getLogger(__name__)
 
 DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
 SHIFTS = ['morning', 'evening', 'night']
 SHIFT_HOURS = 8
+ALL_SLOTS = [(d, s) for d in DAYS for s in SHIFTS]
+# (day, shift, role) -> staff needed every week; role '' takes anyone
+Demand = Dict[Tuple[str, str, str], int]
+# rosters at least this large use the NumPy heuristic and random schedulers
+VECTORIZE_MIN_EMPLOYEES = 256
+# bump when ImportRecord changes so stale snapshots are re-parsed
+SNAPSHOT_VERSION = 1
+IMPORT_EXTENSIONS = ('.xlsx', '.pdf')
+# PDFs longer than this are split into page ranges parsed in parallel
+PDF_CHUNK_PAGES = 8
+# horizon plans kept per roster (one per distinct request)
+HORIZON_CACHE_SIZE = 16
+
+# bit i of an availability mask is ALL_SLOTS[i]; bit i of a time-off mask is DAYS[i]
+SLOT_BITS = {slot: 1 << i for i, slot in enumerate(ALL_SLOTS)}
+DAY_BITS = {d: 1 << i for i, d in enumerate(DAYS)}
+DAY_SLOT_MASKS = {d: sum(SLOT_BITS[(d, s)] for s in SHIFTS) for d in DAYS}
+# time-off mask -> the slots it blocks
+_OFF_SLOTS = [sum(DAY_SLOT_MASKS[d] for d in DAYS if off & DAY_BITS[d])
+              for off in range(1 << len(DAYS))]
+
+
+class _ShiftSet(MutableSet):
+    """Live set view of the shifts an employee is available for on one day."""
+    __slots__ = ('_emp', '_day')
+
+    def __init__(self, emp: 'Employee', day: str):
+        self._emp = emp
+        self._day = day
+
+    def __contains__(self, shift) -> bool:
+        return bool(self._emp.availability_mask & SLOT_BITS.get((self._day, shift), 0))
+
+    def __iter__(self):
+        mask = self._emp.availability_mask
+        return (s for s in SHIFTS if mask & SLOT_BITS.get((self._day, s), 0))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def add(self, shift: str):
+        # shifts and days outside SHIFTS/DAYS can never be scheduled and are ignored
+        self._emp.availability_mask |= SLOT_BITS.get((self._day, shift), 0)
+
+    def discard(self, shift: str):
+        self._emp.availability_mask &= ~SLOT_BITS.get((self._day, shift), 0)
+
+    def update(self, shifts: Iterable[str]):
+        for shift in shifts:
+            self.add(shift)
+
+    def __repr__(self) -> str:
+        return repr(set(self))
+
+
+class _Availability(MutableMapping):
+    """Day -> shifts view of an availability mask that behaves like ``defaultdict(set)``."""
+    __slots__ = ('_emp',)
+
+    def __init__(self, emp: 'Employee'):
+        self._emp = emp
+
+    def __getitem__(self, day: str) -> _ShiftSet:
+        return _ShiftSet(self._emp, day)
+
+    def __setitem__(self, day: str, shifts: Iterable[str]):
+        del self[day]
+        self[day].update(shifts)
+
+    def __delitem__(self, day: str):
+        self._emp.availability_mask &= ~DAY_SLOT_MASKS.get(day, 0)
+
+    def __iter__(self):
+        mask = self._emp.availability_mask
+        return (d for d in DAYS if mask & DAY_SLOT_MASKS[d])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr({d: set(s) for d, s in self.items()})
+
+
+class _TimeOff(MutableSet):
+    """Live set view of a time-off mask."""
+    __slots__ = ('_emp',)
+
+    def __init__(self, emp: 'Employee'):
+        self._emp = emp
+
+    def __contains__(self, day) -> bool:
+        return bool(self._emp.time_off_mask & DAY_BITS.get(day, 0))
+
+    def __iter__(self):
+        mask = self._emp.time_off_mask
+        return (d for d in DAYS if mask & DAY_BITS[d])
+
+    def __len__(self) -> int:
+        return bin(self._emp.time_off_mask).count('1')
+
+    def add(self, day: str):
+        self._emp.time_off_mask |= DAY_BITS.get(day, 0)
+
+    def discard(self, day: str):
+        self._emp.time_off_mask &= ~DAY_BITS.get(day, 0)
+
+    def update(self, days: Iterable[str]):
+        for day in days:
+            self.add(day)
+
+    def __repr__(self) -> str:
+        return repr(set(self))
+
 
-@dataclass
 class Employee:
+    """An employee with availability and time off stored as bitmasks.
+
+    ``availability`` and ``time_off`` are live views that read and write the
+    masks like a ``defaultdict(set)`` and a ``set`` would; days and shifts
+    outside ``DAYS``/``SHIFTS`` are ignored. ``role`` is matched against
+    staffing demand by ``generate_horizon``; without one (``''``) an employee
+    can fill any role.
+    """
+    __slots__ = ('name', 'max_hours', 'id', 'role', 'availability_mask', 'time_off_mask')
+
+    def __init__(self, name: str, max_hours: int = 40,
+                 availability: Optional[Dict[str, Iterable[str]]] = None,
+                 time_off: Optional[Iterable[str]] = None, id: int = 0, role: str = ''):
+        self.name = name
+        self.max_hours = max_hours
+        self.id = id
+        self.role = normalize_role(role)
+        self.availability_mask = 0
+        self.time_off_mask = 0
+        for day, shifts in (availability or {}).items():
+            self.availability[day].update(shifts)
+        self.time_off.update(time_off or ())
+
+    @property
+    def availability(self) -> _Availability:
+        return _Availability(self)
+
+    @availability.setter
+    def availability(self, value: Dict[str, Iterable[str]]):
+        self.availability_mask = 0
+        for day, shifts in value.items():
+            self.availability[day].update(shifts)
+
+    @property
+    def time_off(self) -> _TimeOff:
+        return _TimeOff(self)
+
+    @time_off.setter
+    def time_off(self, value: Iterable[str]):
+        self.time_off_mask = 0
+        self.time_off.update(value)
+
+    @property
+    def slot_mask(self) -> int:
+        """Slots the employee can work: available and not off that day."""
+        return self.availability_mask & ~_OFF_SLOTS[self.time_off_mask]
+
+    def copy(self) -> 'Employee':
+        """Independent copy to edit before publishing it in a new registry."""
+        emp = Employee(self.name, self.max_hours, id=self.id, role=self.role)
+        emp.availability_mask = self.availability_mask
+        emp.time_off_mask = self.time_off_mask
+        return emp
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Employee):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"Employee(name={self.name!r}, max_hours={self.max_hours!r}, "
+                f"availability={self.availability!r}, time_off={self.time_off!r}, id={self.id!r}, "
+                f"role={self.role!r})")
+
+@dataclass
+class ImportRecord:
+    """One employee row parsed from an uploaded file."""
     name: str
     max_hours: int = 40
-    availability: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
-    time_off: Set[str] = field(default_factory=set)
-    id: int = field(default=0)
-    assigned_hours: int = 0
+    days: List[str] = field(default_factory=list)
+    shifts: List[str] = field(default_factory=list)
+    time_off: List[str] = field(default_factory=list)
+    row: int = 0
+    role: str = ''
+
+@dataclass
+class ImportReport:
+    """Outcome of an import: employees added/updated and (row, error) pairs."""
+    path: str = ''
+    added: int = 0
+    updated: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+@dataclass
+class SolveStats:
+    """What one generate_schedule call did and how long each phase took."""
+    method: str
+    cache_hit: bool = False
+    phases: Dict[str, float] = field(default_factory=dict)
+    status: Optional[str] = None
+    objective: Optional[float] = None
+    num_vars: int = 0
+    # employee classes the model was reduced to, if it was
+    classes: Optional[int] = None
+    conflicts: int = 0
+    branches: int = 0
+    # slots nobody on the roster can work, found before solving
+    uncoverable: List[Tuple[str, str]] = field(default_factory=list)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def header(self) -> str:
+        """Compact ``key=value; ...`` form for debug response headers."""
+        parts = [f"method={self.method}", f"cache={'hit' if self.cache_hit else 'miss'}"]
+        parts += [f"{name}={seconds:.6f}" for name, seconds in self.phases.items()]
+        if self.status is not None:
+            parts += [f"status={self.status}", f"objective={self.objective}",
+                      f"vars={self.num_vars}", f"conflicts={self.conflicts}",
+                      f"branches={self.branches}"]
+        if self.classes is not None:
+            parts.append(f"classes={self.classes}")
+        if self.uncoverable:
+            parts.append(f"uncoverable={len(self.uncoverable)}")
+        return '; '.join(parts)
+
+@dataclass
+class HorizonPlan:
+    """What generate_horizon planned: one multi-staff schedule per week."""
+    # week -> day -> shift -> names of everyone working it
+    weeks: List[Dict[str, Dict[str, List[str]]]] = field(default_factory=list)
+    # employee id -> hours over the whole horizon
+    hours: Dict[int, int] = field(default_factory=dict)
+    # seats in the demand nobody could fill
+    unfilled: int = 0
+    # one per solved window
+    stats: List[SolveStats] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            'weeks': self.weeks,
+            'hours': self.hours,
+            'unfilled': self.unfilled,
+            'windows': [{'status': st.status, 'objective': st.objective, 'vars': st.num_vars,
+                         'classes': st.classes, 'phases': st.phases} for st in self.stats],
+        }
+
+def _uncoverable_slots(roster: 'EmployeeRegistry') -> List[Tuple[str, str]]:
+    np = _optional('numpy')
+    if np is None:
+        return [(d, s) for d, s in ALL_SLOTS if not roster.eligible(d, s)]
+    _, matrix = roster.eligibility_matrix()
+    return [ALL_SLOTS[col] for col in np.flatnonzero(~matrix.any(axis=0))]
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def _importable(path: str) -> bool:
+    return os.path.isfile(path) and os.path.splitext(path)[1].lower() in IMPORT_EXTENSIONS
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _snapshot_entry(st: os.stat_result, digest: str, records: List[ImportRecord]) -> dict:
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest,
+            'records': [asdict(r) for r in records]}
+
+def _parse_excel(path: str, report: ImportReport) -> Iterator[ImportRecord]:
+    """Stream rows of the first worksheet without loading the whole workbook."""
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = {str(h).strip(): i for i, h in enumerate(header) if h is not None}
+
+        def cell(values, column):
+            i = columns.get(column)
+            value = values[i] if i is not None and i < len(values) else None
+            return '' if value is None else str(value).strip()
+
+        for row, values in enumerate(rows, start=2):
+            name = cell(values, 'Name')
+            if not name:
+                continue
+            try:
+                max_hours = cell(values, 'MaxHours')
+                yield ImportRecord(
+                    name=name,
+                    max_hours=int(float(max_hours)) if max_hours else 40,
+                    days=_split(cell(values, 'Days')),
+                    shifts=_split(cell(values, 'Shifts')),
+                    time_off=_split(cell(values, 'TimeOff')),
+                    row=row,
+                    role=cell(values, 'Role'),
+                )
+            except ValueError as e:
+                report.errors.append((row, str(e)))
+    finally:
+        wb.close()
+
+def _parse_pdf_lines(lines: Iterable[str]) -> Iterator[ImportRecord]:
+    """One employee per text line: name, max hours, days, shifts, time off, role."""
+    for row, line in enumerate(lines, start=1):
+        parts = [p.strip() for p in line.split(',')]
+        name = parts[0]
+        if not name:
+            continue
+        yield ImportRecord(
+            name=name,
+            max_hours=int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 40,
+            days=parts[2].split() if len(parts) > 2 else [],
+            shifts=parts[3].split() if len(parts) > 3 else [],
+            time_off=parts[4].split() if len(parts) > 4 else [],
+            row=row,
+            role=parts[5] if len(parts) > 5 else '',
+        )
+
+def _pdf_page_count(path: str) -> int:
+    if not path.lower().endswith('.pdf'):
+        return 0
+    try:
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        # let the parse itself report the broken file
+        return 0
+
+def _parse_task(path: str, start: Optional[int] = None, stop: Optional[int] = None):
+    """Parse a whole file, or pages ``start:stop`` of a PDF.
+
+    Runs in pool workers, so it only returns plain data: the number of text
+    lines seen, the parsed records and (row, error) pairs.
+    """
+    report = ImportReport(path=path)
+    ext = os.path.splitext(path)[1].lower()
+    if ext.endswith('xlsx'):
+        return 0, list(_parse_excel(path, report)), report.errors
+    if ext.endswith('pdf'):
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            lines = [line for page in pdf.pages[start:stop]
+                     for line in (page.extract_text() or '').splitlines()]
+        return len(lines), list(_parse_pdf_lines(lines)), report.errors
+    return 0, [], []
+
+def _pool_context():
+    # fork keeps workers from re-running the web app's module-level setup;
+    # it is only safe while the process has a single thread, see _start_import_pool
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive key for employee names."""
+    return ' '.join(name.split()).lower()
+
+def normalize_role(role: str) -> str:
+    """Roles compare like names: 'Line  Cook' is 'line cook'."""
+    return ' '.join(role.split()).lower()
+
+def default_demand() -> Demand:
+    """One employee of any role per shift, as generate_schedule plans."""
+    return {(day, shift, ''): 1 for day, shift in ALL_SLOTS}
+
+def demand_from_roles(roles: Dict[str, Iterable[str]]) -> Demand:
+    """Demand from answers like the chatbot's ``{'Mon': ['cook', 'manager']}``.
+
+    A key is a day, meaning each of its shifts, or a day and shift such as
+    'Mon evening'. Listing a role twice or writing '2 cook' asks for two; a
+    bare number asks for that many people of any role.
+    """
+    demand: Demand = defaultdict(int)
+    for key, items in roles.items():
+        parts = key.split()
+        day = parts[0][:3].title() if parts else ''
+        if day not in DAYS:
+            continue
+        shifts = [p.lower() for p in parts[1:] if p.lower() in SHIFTS] or SHIFTS
+        for item in items:
+            count, _, role = item.strip().partition(' ')
+            if not count.isdigit():
+                count, role = '1', item
+            for shift in shifts:
+                demand[(day, shift, normalize_role(role))] += int(count)
+    return dict(demand)
+
+def _fill_window(classes: List[List[Employee]], counts: Dict[tuple, int],
+                 weeks: int) -> List[Dict[Tuple[str, str], List[int]]]:
+    """Name the class members behind a window's per-class seat counts.
+
+    Week by week each seat goes to the member with the fewest shifts that
+    week, then in the window, then the lowest id, skipping anyone already on
+    that shift. Loads within a week stay within one of each other, so nobody
+    passes the weekly cap the model put on the class as a whole.
+    """
+    result = [defaultdict(list) for _ in range(weeks)]
+    order = {slot: i for i, slot in enumerate(ALL_SLOTS)}
+    by_class = defaultdict(list)
+    for (c, week, day, shift, _), count in counts.items():
+        if count:
+            by_class[c].append((week, order[(day, shift)], day, shift, count))
+    for c, seats in by_class.items():
+        members = [emp.id for emp in classes[c]]
+        total = dict.fromkeys(members, 0)
+        week_load, current = {}, None
+        for week, _, day, shift, count in sorted(seats):
+            if week != current:
+                week_load, current = dict.fromkeys(members, 0), week
+            taken = result[week][(day, shift)]
+            free = (i for i in members if i not in taken)
+            for i in heapq.nsmallest(count, free, key=lambda i: (week_load[i], total[i], i)):
+                taken.append(i)
+                week_load[i] += 1
+                total[i] += 1
+    return result
+
+def _maximize_keeping(model, objective, keep: list):
+    """Maximize ``objective``, then the number of ``keep`` variables set.
+
+    Scaling the objective by len(keep) + 1 makes keeping previous holders
+    worth less than a single unit of it, so stability only breaks ties.
+    """
+    if keep:
+        model.Maximize(objective * (len(keep) + 1) + sum(keep))
+    else:
+        model.Maximize(objective)
+
+def _expand_classes(classes: List[List[Employee]], chosen: Dict[Tuple[str, str], int],
+                    previous: Dict[Tuple[str, str], int]) -> Dict[Tuple[str, str], int]:
+    """Turn slot -> class into slot -> employee id, spreading each class's shifts evenly.
+
+    No member gets more than ceil(shifts / members). Slots a member held in
+    ``previous`` stay with them where that allows, the rest go to the least
+    loaded member, lowest id first.
+    """
+    by_class = defaultdict(list)
+    for slot in ALL_SLOTS:
+        if slot in chosen:
+            by_class[chosen[slot]].append(slot)
+    assignment = {}
+    for c, slots in by_class.items():
+        cap = -(-len(slots) // len(classes[c]))
+        load = {emp.id: 0 for emp in classes[c]}
+        rest = []
+        for slot in slots:
+            eid = previous.get(slot)
+            if eid in load and load[eid] < cap:
+                assignment[slot] = eid
+                load[eid] += 1
+            else:
+                rest.append(slot)
+        for slot in rest:
+            eid = min(load, key=lambda i: (load[i], i))
+            assignment[slot] = eid
+            load[eid] += 1
+    return assignment
+
+class EmployeeRegistry:
+    """Employees indexed by id, normalized name and eligible (day, shift) slot.
+
+    Once a Scheduler publishes a registry it is never modified: writers edit
+    a ``copy`` and swap it in, so readers and running solves keep a
+    consistent roster without locking. Iteration yields employees in id order.
+    """
+    def __init__(self):
+        self._by_id: Dict[int, Employee] = {}
+        self._by_name: Dict[str, List[Employee]] = {}
+        # slot -> ids of eligible employees, kept sorted
+        self._eligible: Dict[Tuple[str, str], List[int]] = {slot: [] for slot in ALL_SLOTS}
+        # slots whose id list belongs to this registry rather than the one copied
+        self._owned: Set[Tuple[str, str]] = set(ALL_SLOTS)
+        # id -> slot mask the index was built from
+        self._slots: Dict[int, int] = {}
+        self._matrix = None
+        self._fingerprint: Optional[str] = None
+
+    def copy(self) -> 'EmployeeRegistry':
+        """Registry to edit and publish in place of this one.
+
+        Index lists are shared until the copy changes them, so a batch of
+        edits costs one pass over the roster rather than one per edit.
+        """
+        clone = EmployeeRegistry.__new__(EmployeeRegistry)
+        clone._by_id = dict(self._by_id)
+        clone._by_name = dict(self._by_name)
+        clone._eligible = dict(self._eligible)
+        clone._owned = set()
+        clone._slots = dict(self._slots)
+        clone._matrix = self._matrix
+        clone._fingerprint = None
+        return clone
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, emp_id: int) -> bool:
+        return emp_id in self._by_id
+
+    def add(self, emp: Employee):
+        self._by_id[emp.id] = emp
+        key = normalize_name(emp.name)
+        self._by_name[key] = self._by_name.get(key, []) + [emp]
+        self._slots[emp.id] = 0
+        self._changed()
+        self.reindex(emp)
+
+    def put(self, emp: Employee):
+        """Replace the employee with ``emp.id`` by ``emp``, an edited copy."""
+        old = self._by_id[emp.id]
+        self._by_id[emp.id] = emp
+        key = normalize_name(old.name)
+        self._by_name[key] = [e for e in self._by_name[key] if e is not old]
+        key = normalize_name(emp.name)
+        self._by_name[key] = sorted(self._by_name.get(key, []) + [emp], key=lambda e: e.id)
+        self._changed()
+        self.reindex(emp)
+
+    def get(self, emp_id: int) -> Optional[Employee]:
+        return self._by_id.get(emp_id)
+
+    def find(self, name: str) -> Optional[Employee]:
+        """First employee with the given name, ignoring case and spacing."""
+        matches = self._by_name.get(normalize_name(name))
+        return matches[0] if matches else None
+
+    def eligible(self, day: str, shift: str) -> List[Employee]:
+        """Employees available for ``shift`` on ``day`` and not off that day."""
+        by_id = self._by_id
+        return [by_id[i] for i in self._eligible.get((day, shift), ())]
+
+    def reindex(self, emp: Employee):
+        mask = emp.slot_mask
+        changed = mask ^ self._slots[emp.id]
+        for slot, bit in SLOT_BITS.items():
+            if changed & bit:
+                ids = self._own(slot)
+                if mask & bit:
+                    insort(ids, emp.id)
+                else:
+                    del ids[bisect_left(ids, emp.id)]
+        self._slots[emp.id] = mask
+
+    def _own(self, slot: Tuple[str, str]) -> List[int]:
+        if slot not in self._owned:
+            self._eligible[slot] = list(self._eligible[slot])
+            self._owned.add(slot)
+        return self._eligible[slot]
+
+    def _changed(self):
+        # the cached matrix holds employee objects, so any edit drops it
+        self._matrix = None
+        self._fingerprint = None
+
+    def fingerprint(self) -> str:
+        """Content hash of employees, their roles, availability and time off."""
+        if self._fingerprint is None:
+            roster = [[emp.id, emp.name, emp.max_hours, emp.role, emp.availability_mask,
+                       emp.time_off_mask] for emp in self]
+            payload = json.dumps(roster, separators=(',', ':'))
+            self._fingerprint = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        return self._fingerprint
+
+    def eligibility_matrix(self):
+        """Employees in id order and their employees x ALL_SLOTS boolean matrix.
+
+        Requires NumPy; the result is cached until the roster changes.
+        """
+        if self._matrix is None:
+            np = _optional('numpy')
+            ids = sorted(self._by_id)
+            masks = np.fromiter((self._slots[i] for i in ids), dtype=np.int64, count=len(ids))
+            # column j is bit j of each slot mask
+            matrix = ((masks[:, None] >> np.arange(len(ALL_SLOTS))) & 1).astype(bool)
+            self._matrix = ([self._by_id[i] for i in ids], matrix)
+        return self._matrix
+
+@dataclass
+class _SolveState:
+    """The roster a solve works on, its warm-start data and its own hour counters."""
+    roster: EmployeeRegistry
+    version: int = 0
+    # CP-SAT assignment to warm-start from and the slots edited since
+    previous: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    dirty: frozenset = frozenset()
+    hours: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
 
 class Scheduler:
-    def __init__(self, data_dir: str = "data"):
-        self.employees: List[Employee] = []
+    def __init__(self, data_dir: str = "data", time_limit: Optional[float] = None,
+                 num_workers: Optional[int] = None, import_workers: Optional[int] = None,
+                 store=None, background: bool = False, reduce_symmetry: bool = True):
+        """Load the roster from ``store`` and the uploads in ``data_dir``.
+
+        With ``background`` that happens on a thread and the constructor
+        returns at once; ``wait_ready`` blocks until the roster is loaded.
+        ``reduce_symmetry`` lets CP-SAT treat interchangeable employees as one
+        class, see ``_symmetry_classes``.
+        """
+        self.registry = EmployeeRegistry()
         self.next_id = 1
+        # optional storage.RosterStore the roster is persisted to
+        self.store = store
+        # default CP-SAT limits; None leaves the solver's own default
+        self.time_limit = time_limit
+        self.num_workers = num_workers
+        self.reduce_symmetry = reduce_symmetry
+        # processes used to parse uploads
+        self.import_workers = import_workers or os.cpu_count() or 1
+        self._import_pool = self._start_import_pool()
+        # writers publish a new registry under this lock; solves only take it
+        # briefly to pick up a snapshot and file their results
+        self._lock = threading.RLock()
+        # bumped on every published roster change
+        self._version = 0
+        # solved schedules keyed by (roster fingerprint, method, CP-SAT limits),
+        # and solves in progress
+        self._schedule_cache: Dict[tuple, Dict[str, Dict[str, str]]] = {}
+        self._solving: Dict[tuple, Future] = {}
+        # horizon plans keyed by roster fingerprint and request, oldest first
+        self._horizon_cache: Dict[tuple, HorizonPlan] = {}
+        # last CP-SAT assignment (slot -> employee id), the roster version it
+        # was solved for, and slots changed since with the version of their last change
+        self._last_assignment: Dict[Tuple[str, str], int] = {}
+        self._assignment_version = 0
+        self._dirty_slots: Dict[Tuple[str, str], int] = {}
+        # SolveStats of the calling thread's last generate_schedule
+        self._local = threading.local()
         self.data_dir = data_dir
         self.import_dir = os.path.join(self.data_dir, "imports")
+        # parsed records of every upload, see load_imports
+        self.snapshot_file = os.path.join(self.data_dir, "import_snapshot.json")
+        self._snapshot_files: Dict[str, dict] = {}
+        self.import_stats: Dict[str, int] = {}
+        # set once the roster has loaded; load_error holds why a background load failed
+        self.ready = threading.Event()
+        self.load_error: Optional[BaseException] = None
         os.makedirs(self.import_dir, exist_ok=True)
+        if background:
+            threading.Thread(target=self._load_in_background, name='roster-load',
+                             daemon=True).start()
+        else:
+            self._load()
+
+    def _start_import_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool for parsing uploads, kept for the scheduler's lifetime.
+
+        Its workers are forked here, before the background loader, solves or
+        request threads exist: a child forked while another thread holds a
+        lock (imports, logging, SQLite) can deadlock on it.
+        """
+        if self.import_workers <= 1:
+            return None
+        pool = ProcessPoolExecutor(max_workers=self.import_workers, mp_context=_pool_context())
+        # with fork the first task starts every worker at once
+        pool.submit(int).result()
+        return pool
+
+    def close(self):
+        """Stop the import workers."""
+        if self._import_pool is not None:
+            self._import_pool.shutdown()
+            self._import_pool = None
+
+    def _load(self):
+        if self.store is not None:
+            self._load_store()
         self.load_imports()
+        self.ready.set()
+
+    def _load_in_background(self):
+        try:
+            self._load()
+        except Exception as e:
+            logger.exception("Loading the roster failed")
+            self.load_error = e
+            self.ready.set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the roster has loaded; False if ``timeout`` ran out first."""
+        return self.ready.wait(timeout)
+
+    @property
+    def employees(self) -> List[Employee]:
+        return list(self.registry)
+
+    def _load_store(self):
+        registry = EmployeeRegistry()
+        for emp in self.store.load():
+            registry.add(emp)
+            self.next_id = max(self.next_id, emp.id + 1)
+        self.registry = registry
+
+    def refresh(self) -> bool:
+        """Reload the roster if another process changed the store."""
+        if self.store is None or not self.store.changed():
+            return False
+        with self._lock:
+            self._load_store()
+            self._invalidate(ALL_SLOTS)
+        return True
 
-    def load_imports(self):
-        """Load all previously uploaded files."""
-        for fname in os.listdir(self.import_dir):
+    def _snapshot(self) -> _SolveState:
+        with self._lock:
+            return _SolveState(roster=self.registry, version=self._version,
+                               previous=self._last_assignment,
+                               dirty=frozenset(self._dirty_slots))
+
+    def load_imports(self) -> Dict[str, int]:
+        """Load all previously uploaded files.
+
+        Parsed records are kept in a snapshot keyed by each file's size, mtime
+        and SHA-256, so only new or modified uploads are parsed again. Those
+        are parsed in parallel and merged in file-name order. With a store,
+        uploads it has already applied are skipped entirely.
+        """
+        previous = self._read_snapshot()
+        files = {}
+        stale = []
+        stats = {'snapshot': 0, 'parsed': 0, 'failed': 0}
+        for fname in sorted(os.listdir(self.import_dir)):
             path = os.path.join(self.import_dir, fname)
-            try:
-                self.import_file(path)
-            except Exception:
-                # skip malformed files
+            if not _importable(path):
                 continue
+            st = os.stat(path)
+            entry = previous.get(fname)
+            if entry is not None and (entry['size'], entry['mtime_ns']) == (st.st_size, st.st_mtime_ns):
+                files[fname] = entry
+                continue
+            digest = _file_digest(path)
+            if entry is not None and entry['sha256'] == digest:
+                # touched but unchanged
+                files[fname] = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            else:
+                stale.append((fname, st, digest))
+        stats['snapshot'] = len(files)
 
-    def import_file(self, path: str):
-        ext = os.path.splitext(path)[1].lower()
-        if ext.endswith('xlsx'):
-            self._import_excel(path)
-        elif ext.endswith('pdf'):
-            self._import_pdf(path)
-
-    def _import_excel(self, path: str):
-        df = pd.read_excel(path)
-        for _, row in df.iterrows():
-            name = str(row.get('Name', '')).strip()
-            if not name:
+        paths = [os.path.join(self.import_dir, fname) for fname, _, _ in stale]
+        for (fname, st, digest), result in zip(stale, self._parse_files(paths)):
+            if isinstance(result, Exception):
+                # skip malformed files
+                stats['failed'] += 1
                 continue
-            max_hours = int(row.get('MaxHours', 40))
-            emp = Employee(name=name, max_hours=max_hours)
-            self.add_employee(emp)
-            days = str(row.get('Days', '')).split(',')
-            shifts = str(row.get('Shifts', '')).split(',')
-            self.update_availability(emp.id,
-                [d.strip() for d in days if d.strip()],
-                [s.strip() for s in shifts if s.strip()])
-            for day in str(row.get('TimeOff', '')).split(','):
-                d = day.strip()
-                if d:
-                    self.request_time_off(emp.id, d)
-
-    def _import_pdf(self, path: str):
-        text = ''
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                if page.extract_text():
-                    text += page.extract_text() + '\n'
-        for line in text.splitlines():
-            parts = [p.strip() for p in line.split(',')]
-            if not parts:
+            files[fname] = _snapshot_entry(st, digest, result[0])
+            stats['parsed'] += 1
+
+        files = dict(sorted(files.items()))
+        applied = self.store.imported_files() if self.store is not None else {}
+        pending = {fname: entry for fname, entry in files.items()
+                   if applied.get(fname) != entry['sha256']}
+        self.apply_records(ImportRecord(**r) for entry in pending.values() for r in entry['records'])
+        if self.store is not None:
+            for fname, entry in pending.items():
+                self.store.mark_imported(fname, entry['sha256'])
+        with self._lock:
+            self._snapshot_files = files
+            if files != previous:
+                self._write_snapshot()
+        self.import_stats = stats
+        logger.info("Imports: %d loaded from snapshot, %d re-parsed, %d failed",
+                    stats['snapshot'], stats['parsed'], stats['failed'])
+        return stats
+
+    def import_file(self, path: str,
+                    progress: Optional[Callable[[int, int], None]] = None) -> ImportReport:
+        """Upsert the employees described in an Excel or PDF file.
+
+        Large PDFs are split into page ranges parsed across the process pool;
+        ``progress(done, total)`` is called as each range finishes.
+        """
+        report = ImportReport(path=path)
+        fmt = os.path.splitext(path)[1].lower().lstrip('.') or 'unknown'
+        start = time.perf_counter()
+        result = self._parse_files([path], progress)[0]
+        parsed = time.perf_counter()
+        METRICS.observe('import_seconds', parsed - start, format=fmt, phase='parse')
+        if isinstance(result, Exception):
+            raise result
+        records, report.errors = result
+        self.apply_records(records, report)
+        METRICS.observe('import_seconds', time.perf_counter() - parsed, format=fmt, phase='apply')
+        METRICS.inc('import_rows_total', report.added, format=fmt, outcome='added')
+        METRICS.inc('import_rows_total', report.updated, format=fmt, outcome='updated')
+        METRICS.inc('import_rows_total', len(report.errors), format=fmt, outcome='error')
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.import_dir):
+            st = os.stat(path)
+            entry = _snapshot_entry(st, _file_digest(path), records)
+            with self._lock:
+                self._snapshot_files[os.path.basename(path)] = entry
+                self._write_snapshot()
+            if self.store is not None:
+                self.store.mark_imported(os.path.basename(path), entry['sha256'])
+        return report
+
+    def _parse_files(self, paths: List[str],
+                     progress: Optional[Callable[[int, int], None]] = None) -> list:
+        """Parse files, in parallel when worthwhile.
+
+        Returns one ``(records, errors)`` pair, or the exception raised while
+        parsing, per path and in the order given, so results match a serial
+        parse regardless of which worker finished first.
+        """
+        tasks = []
+        for i, path in enumerate(paths):
+            pages = _pdf_page_count(path)
+            if pages > PDF_CHUNK_PAGES:
+                tasks.extend((i, start, min(start + PDF_CHUNK_PAGES, pages))
+                             for start in range(0, pages, PDF_CHUNK_PAGES))
+            else:
+                tasks.append((i, None, None))
+
+        results = [None] * len(tasks)
+        futures = None
+        pool = self._import_pool
+        if pool is not None and len(tasks) > 1:
+            try:
+                futures = {pool.submit(_parse_task, paths[i], start, stop): n
+                           for n, (i, start, stop) in enumerate(tasks)}
+            except BrokenProcessPool:
+                # a worker died; starting new ones now would fork a threaded process
+                logger.warning("Import pool is broken, parsing serially")
+                self._import_pool = None
+        if futures is not None:
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    results[futures[future]] = e
+                if progress:
+                    progress(done, len(tasks))
+        else:
+            for n, (i, start, stop) in enumerate(tasks):
+                try:
+                    results[n] = _parse_task(paths[i], start, stop)
+                except Exception as e:
+                    results[n] = e
+                if progress:
+                    progress(n + 1, len(tasks))
+
+        # stitch page ranges back together, renumbering rows as one document
+        parsed = [([], []) for _ in paths]
+        offsets = [0] * len(paths)
+        for (i, _, _), result in zip(tasks, results):
+            if isinstance(parsed[i], Exception):
                 continue
-            name = parts[0]
-            if not name:
+            if isinstance(result, Exception):
+                parsed[i] = result
                 continue
-            max_hours = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 40
-            emp = Employee(name=name, max_hours=max_hours)
-            self.add_employee(emp)
-            days = parts[2].split() if len(parts) > 2 else []
-            shifts = parts[3].split() if len(parts) > 3 else []
-            self.update_availability(emp.id,
-                [d.strip() for d in days if d.strip()],
-                [s.strip() for s in shifts if s.strip()])
-            timeoff = parts[4].split() if len(parts) > 4 else []
-            for day in timeoff:
-                day = day.strip()
-                if day:
-                    self.request_time_off(emp.id, day)
+            lines, records, errors = result
+            for rec in records:
+                rec.row += offsets[i]
+            offsets[i] += lines
+            parsed[i][0].extend(records)
+            parsed[i][1].extend(errors)
+        return parsed
+
+    def _read_snapshot(self) -> Dict[str, dict]:
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != SNAPSHOT_VERSION:
+            return {}
+        return data.get('files', {})
+
+    def _write_snapshot(self):
+        tmp = self.snapshot_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_VERSION, 'files': self._snapshot_files}, f,
+                      separators=(',', ':'))
+        os.replace(tmp, self.snapshot_file)
+
+    def apply_records(self, records: Iterable[ImportRecord],
+                      report: Optional[ImportReport] = None) -> ImportReport:
+        """Upsert parsed records by name in a single batch.
+
+        Existing employees get the record's max hours (and role, if it has
+        one) and have its availability and time off merged in; unknown names
+        are added. A bad record is noted
+        in the report and does not stop the batch.
+        """
+        report = report or ImportReport()
+        records = list(records)
+        with self._lock:
+            registry = self.registry.copy()
+            fresh = {normalize_name(rec.name) for rec in records
+                     if registry.find(rec.name) is None}
+            next_id = self._reserve_ids(len(fresh))
+            touched = {}
+            for rec in records:
+                try:
+                    emp = registry.find(rec.name)
+                    if emp is None:
+                        emp = Employee(name=rec.name, max_hours=rec.max_hours, id=next_id,
+                                       role=rec.role)
+                        next_id += 1
+                        registry.add(emp)
+                        report.added += 1
+                    else:
+                        # published employees are shared with readers; edit a copy
+                        emp = touched.get(emp.id) or emp.copy()
+                        emp.max_hours = rec.max_hours
+                        if rec.role:
+                            emp.role = normalize_role(rec.role)
+                        report.updated += 1
+                    for d in rec.days:
+                        emp.availability[d].update(rec.shifts)
+                    emp.time_off.update(rec.time_off)
+                    registry.put(emp)
+                    touched[emp.id] = emp
+                except Exception as e:
+                    report.errors.append((rec.row, str(e)))
+            self._persist(*touched.values())
+            self._publish(registry, ALL_SLOTS)
+        return report
+
+    def _reserve_ids(self, count: int) -> int:
+        """First of ``count`` fresh ids, allocated by the store when there is one."""
+        first = self.next_id
+        if self.store is not None and count:
+            first = self.store.reserve_ids(count)
+        self.next_id = first + count
+        return first
+
+    def _persist(self, *employees: Employee):
+        if self.store is not None:
+            self.store.save(employees)
 
     def add_employee(self, employee: Employee):
-        employee.id = self.next_id
-        self.next_id += 1
-        self.employees.append(employee)
+        with self._lock:
+            employee.id = self._reserve_ids(1)
+            registry = self.registry.copy()
+            registry.add(employee)
+            self._persist(employee)
+            self._publish(registry, ((d, s) for d, shifts in employee.availability.items()
+                                     for s in shifts))
 
     def update_availability(self, emp_id: int, days: List[str], shifts: List[str]):
-        emp = self.get_employee(emp_id)
-        for d in days:
-            emp.availability[d].update(shifts)
+        with self._lock:
+            emp = self.get_employee(emp_id).copy()
+            for d in days:
+                emp.availability[d].update(shifts)
+            registry = self.registry.copy()
+            registry.put(emp)
+            self._persist(emp)
+            self._publish(registry, ((d, s) for d in days for s in shifts))
 
     def request_time_off(self, emp_id: int, day: str):
-        emp = self.get_employee(emp_id)
-        emp.time_off.add(day)
+        with self._lock:
+            emp = self.get_employee(emp_id).copy()
+            emp.time_off.add(day)
+            registry = self.registry.copy()
+            registry.put(emp)
+            self._persist(emp)
+            self._publish(registry, ((day, s) for s in SHIFTS))
+
+    def _publish(self, registry: EmployeeRegistry, slots=()):
+        """Swap in an edited copy of the roster; callers hold ``_lock``."""
+        self.registry = registry
+        self._invalidate(slots)
+
+    def _invalidate(self, slots=()):
+        """Drop cached schedules after the roster changed in ``slots``."""
+        self._version += 1
+        self._dirty_slots.update((slot, self._version) for slot in slots)
+        self._schedule_cache.clear()
+        self._horizon_cache.clear()
+
+    def fingerprint(self) -> str:
+        """Content hash of employees, availability and time off."""
+        return self.registry.fingerprint()
+
+    def schedule_etag(self, randomize: bool = False,
+                      incremental: bool = False) -> Optional[str]:
+        """ETag for the schedule ``generate_schedule`` would return.
+
+        None unless it is a function of the roster alone: random draws differ
+        every time and incremental ones depend on this process's last solve.
+        """
+        if randomize or incremental:
+            return None
+        return f"{self.fingerprint()}-{self._method(randomize, incremental)}"
 
     def get_employee(self, emp_id: int) -> Employee:
-        for emp in self.employees:
-            if emp.id == emp_id:
-                return emp
-        raise ValueError('Employee not found')
+        emp = self.registry.get(emp_id)
+        if emp is None:
+            raise ValueError('Employee not found')
+        return emp
+
+    def find_employee(self, name: str) -> Optional[Employee]:
+        return self.registry.find(name)
+
+    @staticmethod
+    def _vectorize(roster: EmployeeRegistry) -> bool:
+        return len(roster) >= VECTORIZE_MIN_EMPLOYEES and _optional('numpy') is not None
 
-    def reset_hours(self):
-        for emp in self.employees:
-            emp.assigned_hours = 0
+    def uncoverable_slots(self) -> List[Tuple[str, str]]:
+        """Slots no employee can work, whatever the hour limits."""
+        return _uncoverable_slots(self.registry)
 
-    def _heuristic_schedule(self, schedule: Dict[str, Dict[str, str]]):
+    @staticmethod
+    def _capacity_arrays(state: _SolveState):
+        """Eligibility matrix plus assigned-hours and remaining-capacity vectors."""
+        np = _optional('numpy')
+        emps, matrix = state.roster.eligibility_matrix()
+        hours = np.fromiter((state.hours[e.id] for e in emps), dtype=np.int64, count=len(emps))
+        remaining = np.fromiter((e.max_hours for e in emps), dtype=np.int64, count=len(emps)) - hours
+        return emps, matrix, hours, remaining
+
+    def _heuristic_schedule(self, state: _SolveState, schedule: Dict[str, Dict[str, str]]):
         """Fallback simple scheduler if OR-Tools is unavailable."""
+        if self._vectorize(state.roster):
+            return self._heuristic_schedule_np(state, schedule)
+        hours = state.hours
         for day in DAYS:
             for shift in SHIFTS:
                 if schedule[day][shift] is not None:
                     continue
-                for emp in sorted(self.employees, key=lambda e: e.assigned_hours):
-                    if (shift in emp.availability.get(day, set()) and
-                        day not in emp.time_off and
-                        emp.assigned_hours + SHIFT_HOURS <= emp.max_hours):
-                        schedule[day][shift] = emp.name
-                        emp.assigned_hours += SHIFT_HOURS
-                        break
+                # least-loaded first, ties broken by id like a stable sort would
+                emp = min((e for e in state.roster.eligible(day, shift)
+                           if hours[e.id] + SHIFT_HOURS <= e.max_hours),
+                          key=lambda e: (hours[e.id], e.id), default=None)
+                if emp is not None:
+                    schedule[day][shift] = emp.name
+                    hours[emp.id] += SHIFT_HOURS
         return schedule
 
-    def _random_schedule(self, schedule: Dict[str, Dict[str, str]]):
+    def _heuristic_schedule_np(self, state: _SolveState, schedule: Dict[str, Dict[str, str]]):
+        """Array version of ``_heuristic_schedule`` with identical results."""
+        np = _optional('numpy')
+        emps, matrix, hours, remaining = self._capacity_arrays(state)
+        unavailable = np.iinfo(np.int64).max
+        for col, (day, shift) in enumerate(ALL_SLOTS):
+            if schedule[day][shift] is not None:
+                continue
+            mask = matrix[:, col] & (remaining >= SHIFT_HOURS)
+            if not mask.any():
+                continue
+            # argmin returns the first minimum, i.e. the lowest id
+            row = int(np.argmin(np.where(mask, hours, unavailable)))
+            self._assign_row(state, schedule, day, shift, emps[row], row, hours, remaining)
+        return schedule
+
+    def _random_schedule_np(self, state: _SolveState, schedule: Dict[str, Dict[str, str]]):
+        """Array version of ``_random_schedule``; same picks for the same seed."""
+        np = _optional('numpy')
+        emps, matrix, hours, remaining = self._capacity_arrays(state)
+        shifts = [(d, s) for d in DAYS for s in SHIFTS]
+        random.shuffle(shifts)
+        for day, shift in shifts:
+            col = ALL_SLOTS.index((day, shift))
+            candidates = np.flatnonzero(matrix[:, col] & (remaining >= SHIFT_HOURS))
+            if candidates.size:
+                row = int(random.choice(candidates))
+                self._assign_row(state, schedule, day, shift, emps[row], row, hours, remaining)
+        return self._heuristic_schedule(state, schedule)
+
+    @staticmethod
+    def _assign_row(state, schedule, day, shift, emp, row, hours, remaining):
+        schedule[day][shift] = emp.name
+        state.hours[emp.id] += SHIFT_HOURS
+        hours[row] += SHIFT_HOURS
+        remaining[row] -= SHIFT_HOURS
+
+    def _random_schedule(self, state: _SolveState, schedule: Dict[str, Dict[str, str]]):
         """Assign shifts randomly among available employees."""
+        if self._vectorize(state.roster):
+            return self._random_schedule_np(state, schedule)
+        hours = state.hours
         shifts = [(d, s) for d in DAYS for s in SHIFTS]
         random.shuffle(shifts)
         for day, shift in shifts:
-            candidates = [emp for emp in self.employees
-                          if shift in emp.availability.get(day, set())
-                          and day not in emp.time_off
-                          and emp.assigned_hours + SHIFT_HOURS <= emp.max_hours]
+            candidates = [emp for emp in state.roster.eligible(day, shift)
+                          if hours[emp.id] + SHIFT_HOURS <= emp.max_hours]
             if candidates:
                 emp = random.choice(candidates)
                 schedule[day][shift] = emp.name
-                emp.assigned_hours += SHIFT_HOURS
-        return self._heuristic_schedule(schedule)
+                hours[emp.id] += SHIFT_HOURS
+        return self._heuristic_schedule(state, schedule)
+
+    def generate_schedule(self, randomize: bool = False, incremental: bool = False,
+                          time_limit: Optional[float] = None, num_workers: Optional[int] = None,
+                          gap: Optional[float] = None,
+                          on_solution: Optional[Callable[[dict], Optional[bool]]] = None):
+        """Return the schedule for the current roster, solving only on a cache miss.
+
+        With ``incremental`` the previous CP-SAT solution is reused: only the
+        slots touched since then are re-optimized and the rest stay put.
+        ``time_limit`` (seconds) and ``num_workers`` override the scheduler's
+        CP-SAT defaults for this call. ``gap`` stops the search once the
+        relative gap to the best bound is that small, and ``on_solution`` is
+        called with every improving CP-SAT solution as it is found; returning
+        False from it stops the search.
+        """
+        method = self._method(randomize, incremental)
+        stats = SolveStats(method=method)
+        state = self._snapshot()
+        if time_limit is None:
+            time_limit = self.time_limit
+        if num_workers is None:
+            num_workers = self.num_workers
+        if randomize or on_solution is not None:
+            # every random call is a fresh draw, and a stream has to report the
+            # solutions of its own search, so neither is shared with other callers
+            schedule = self._solve(state, randomize, incremental, time_limit, num_workers,
+                                   stats, gap, on_solution)
+            self._local.stats = stats
+            self._record(stats)
+            return schedule
+        # a solve cut short by a tighter limit or gap must not stand in for a longer one
+        key = (state.roster.fingerprint(), method, time_limit, num_workers, gap)
+        with self._lock:
+            schedule = self._schedule_cache.get(key)
+            solving = self._solving.get(key) if schedule is None else None
+            owner = schedule is None and solving is None
+            if owner:
+                solving = self._solving[key] = Future()
+        if owner:
+            try:
+                schedule = self._solve(state, randomize, incremental, time_limit, num_workers,
+                                       stats, gap)
+            except BaseException as e:
+                solving.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    del self._solving[key]
+                    if schedule is not None and state.version == self._version:
+                        self._schedule_cache[key] = schedule
+            solving.set_result(schedule)
+        else:
+            # the same roster is already being solved for this method; share it
+            stats.cache_hit = True
+            if schedule is None:
+                schedule = solving.result()
+        # hand out a copy so callers cannot alter the cached entry
+        schedule = {day: dict(shifts) for day, shifts in schedule.items()}
+        self._local.stats = stats
+        self._record(stats)
+        return schedule
+
+    @property
+    def last_solve_stats(self) -> Optional[SolveStats]:
+        """Stats of the last generate_schedule call made by this thread."""
+        return getattr(self._local, 'stats', None)
 
-    def generate_schedule(self, randomize: bool = False):
-        self.reset_hours()
+    @staticmethod
+    def _record(stats: SolveStats):
+        METRICS.inc('schedule_requests_total', method=stats.method,
+                    cache='hit' if stats.cache_hit else 'miss')
+        for name, seconds in stats.phases.items():
+            METRICS.observe('schedule_phase_seconds', seconds, phase=name)
+        if stats.status is not None:
+            METRICS.inc('schedule_solver_status_total', status=stats.status)
+            METRICS.set('schedule_solver_objective', stats.objective or 0)
+            METRICS.set('schedule_solver_variables', stats.num_vars)
+            METRICS.inc('schedule_solver_conflicts_total', stats.conflicts)
+            METRICS.inc('schedule_solver_branches_total', stats.branches)
+
+    @staticmethod
+    def _method(randomize: bool, incremental: bool) -> str:
+        if randomize:
+            return 'random'
+        return 'incremental' if incremental else 'ai'
+
+    def _solve(self, state: _SolveState, randomize: bool = False, incremental: bool = False,
+               time_limit: Optional[float] = None, num_workers: Optional[int] = None,
+               stats: Optional[SolveStats] = None, gap: Optional[float] = None,
+               on_solution: Optional[Callable[[dict], Optional[bool]]] = None):
+        """Solve ``state``'s roster; nothing shared is touched until the result is filed."""
+        stats = stats or SolveStats(method=self._method(randomize, incremental))
+        state.hours.clear()
         schedule = {d: {s: None for s in SHIFTS} for d in DAYS}
 
         if randomize:
-            return self._random_schedule(schedule)
+            with stats.phase('random'):
+                return self._random_schedule(state, schedule)
 
-        if cp_model is None or not self.employees:
-            return self._heuristic_schedule(schedule)
+        if _optional(CP_MODEL) is None or not state.roster:
+            with stats.phase('heuristic'):
+                return self._heuristic_schedule(state, schedule)
 
+        with stats.phase('precheck'):
+            stats.uncoverable = _uncoverable_slots(state.roster)
+        if len(stats.uncoverable) == len(ALL_SLOTS):
+            # nobody can work any shift, so there is nothing to solve
+            return schedule
+
+        warm = incremental and bool(state.previous)
+        options = (time_limit, num_workers, stats, gap, on_solution)
+        if not self._cp_sat_schedule(state, schedule, warm, *options) and warm:
+            # keeping the untouched slots made the model infeasible
+            state.hours.clear()
+            schedule = {d: {s: None for s in SHIFTS} for d in DAYS}
+            self._cp_sat_schedule(state, schedule, False, *options)
+
+        # Fill remaining shifts heuristically if any
+        with stats.phase('heuristic'):
+            return self._heuristic_schedule(state, schedule)
+
+    def _cp_sat_schedule(self, state: _SolveState, schedule: Dict[str, Dict[str, str]],
+                         warm: bool = False,
+                         time_limit: Optional[float] = None,
+                         num_workers: Optional[int] = None,
+                         stats: Optional[SolveStats] = None, gap: Optional[float] = None,
+                         on_solution: Optional[Callable[[dict], Optional[bool]]] = None) -> bool:
+        """Fill ``schedule`` with a CP-SAT solution; return False if none was found.
+
+        A warm solve hints the previous assignment to the solver and keeps it
+        for every slot not marked dirty since that solve.
+        """
+        stats = stats or SolveStats(method='ai')
+        with stats.phase('build'):
+            classes = self._symmetry_classes(state) if self.reduce_symmetry else None
+            if classes:
+                model, assign = self._build_class_model(state, classes, warm)
+                stats.classes = len(classes)
+            else:
+                model, assign = self._build_model(state, warm)
+        if not assign:
+            return True
+
+        def expand(chosen):
+            return _expand_classes(classes, chosen, state.previous) if classes else chosen
+
+        cp_model = _optional(CP_MODEL)
+        solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        if num_workers is not None:
+            solver.parameters.num_search_workers = num_workers
+        if gap is not None:
+            solver.parameters.relative_gap_limit = gap
+        callback = (_solution_stream_class()(assign, state.roster, on_solution, expand)
+                    if on_solution else None)
+        with stats.phase('solve'):
+            status = solver.Solve(model, callback)
+        stats.status = solver.StatusName(status)
+        stats.num_vars = len(assign)
+        stats.conflicts = solver.NumConflicts()
+        stats.branches = solver.NumBranches()
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return False
+        stats.objective = solver.ObjectiveValue()
+
+        with stats.phase('extract'):
+            assignment = expand({(day, shift): key for (key, day, shift), var in assign.items()
+                                 if solver.Value(var)})
+            for (day, shift), eid in assignment.items():
+                schedule[day][shift] = state.roster.get(eid).name
+                state.hours[eid] += SHIFT_HOURS
+        with self._lock:
+            # a slower solve of an older roster must not replace a newer result
+            if state.version >= self._assignment_version:
+                self._last_assignment = assignment
+                self._assignment_version = state.version
+                self._dirty_slots = {slot: version for slot, version in self._dirty_slots.items()
+                                     if version > state.version}
+        return True
+
+    def _build_model(self, state: _SolveState, warm: bool = False):
+        """CP-SAT model plus its (employee id, day, shift) -> BoolVar map."""
         # Build CP-SAT model for balanced scheduling
-        model = cp_model.CpModel()
+        model = _optional(CP_MODEL).CpModel()
         assign = {}
-        for emp in self.employees:
-            for day in DAYS:
-                if day in emp.time_off:
-                    continue
-                for shift in SHIFTS:
-                    if shift in emp.availability.get(day, set()):
-                        assign[(emp.id, day, shift)] = model.NewBoolVar(f"a_{emp.id}_{day}_{shift}")
+        by_slot = {}
+        by_emp = defaultdict(list)
+        for day, shift in ALL_SLOTS:
+            slot_vars = by_slot[(day, shift)] = []
+            for emp in state.roster.eligible(day, shift):
+                var = model.NewBoolVar(f"a_{emp.id}_{day}_{shift}")
+                assign[(emp.id, day, shift)] = var
+                slot_vars.append(var)
+                by_emp[emp.id].append(var)
 
         if not assign:
-            return schedule
+            return model, assign
+
+        # previous holders of edited slots, kept if nothing better is lost
+        keep = []
+        if warm:
+            previous = state.previous
+            for (eid, day, shift), var in assign.items():
+                kept = previous.get((day, shift)) == eid
+                model.AddHint(var, kept)
+                if kept:
+                    if (day, shift) in state.dirty:
+                        keep.append(var)
+                    else:
+                        model.Add(var == 1)
 
         # At most one employee per shift
-        for day in DAYS:
-            for shift in SHIFTS:
-                vars_for_shift = [assign[(e.id, day, shift)]
-                                  for e in self.employees
-                                  if (e.id, day, shift) in assign]
-                if vars_for_shift:
-                    model.Add(sum(vars_for_shift) == 1)
+        for vars_for_shift in by_slot.values():
+            if vars_for_shift:
+                model.Add(sum(vars_for_shift) == 1)
 
         # Employee hour limits and fairness variable
         max_possible = SHIFT_HOURS * len(DAYS) * len(SHIFTS)
         max_hours_var = model.NewIntVar(0, max_possible, 'max_hours')
-        for emp in self.employees:
-            vars_for_emp = [assign[(emp.id, d, s)]
-                            for d in DAYS for s in SHIFTS
-                            if (emp.id, d, s) in assign]
+        for emp in state.roster:
+            vars_for_emp = by_emp.get(emp.id)
             if vars_for_emp:
                 hours = sum(vars_for_emp) * SHIFT_HOURS
                 model.Add(hours <= emp.max_hours)
@@ -198,16 +1406,301 @@ class Scheduler:
                 model.Add(max_hours_var >= 0)
 
         # Objective: maximize coverage then minimize imbalance
-        model.Maximize(sum(assign.values()) * 100 - max_hours_var)
+        _maximize_keeping(model, sum(assign.values()) * 100 - max_hours_var, keep)
+        return model, assign
 
-        solver = cp_model.CpSolver()
-        solver.Solve(model)
+    @staticmethod
+    def _symmetry_classes(state: _SolveState) -> Optional[List[List[Employee]]]:
+        """Employees grouped by the slots they can work and their shift limit.
 
-        for (eid, day, shift), var in assign.items():
-            if solver.Value(var):
-                emp = self.get_employee(eid)
-                schedule[day][shift] = emp.name
-                emp.assigned_hours += SHIFT_HOURS
+        Members of a class are interchangeable in the model. Returns None when
+        every class would have a single member, i.e. there is nothing to reduce.
+        """
+        groups: Dict[Tuple[int, int], List[Employee]] = {}
+        for emp in state.roster:
+            mask = emp.slot_mask
+            if mask:
+                groups.setdefault((mask, emp.max_hours // SHIFT_HOURS), []).append(emp)
+        if sum(len(members) for members in groups.values()) == len(groups):
+            return None
+        return list(groups.values())
 
-        # Fill remaining shifts heuristically if any
-        return self._heuristic_schedule(schedule)
\ No newline at end of file
+    def _build_class_model(self, state: _SolveState, classes: List[List[Employee]],
+                           warm: bool = False):
+        """CP-SAT model over employee classes plus its (class, day, shift) -> BoolVar map.
+
+        A variable says some member of the class works the slot; which member
+        is decided afterwards by ``_expand_classes``. The objective matches
+        ``_build_model``, so the optimum is the same with far fewer variables
+        and none of the symmetric solutions.
+        """
+        model = _optional(CP_MODEL).CpModel()
+        assign = {}
+        by_slot = defaultdict(list)
+        by_class = defaultdict(list)
+        for c, members in enumerate(classes):
+            mask = members[0].slot_mask
+            for (day, shift), bit in SLOT_BITS.items():
+                if mask & bit:
+                    var = model.NewBoolVar(f"c_{c}_{day}_{shift}")
+                    assign[(c, day, shift)] = var
+                    by_slot[(day, shift)].append(var)
+                    by_class[c].append(var)
+
+        if not assign:
+            return model, assign
+
+        keep = []
+        if warm:
+            owner = {emp.id: c for c, members in enumerate(classes) for emp in members}
+            for (c, day, shift), var in assign.items():
+                kept = owner.get(state.previous.get((day, shift))) == c
+                model.AddHint(var, kept)
+                if kept:
+                    if (day, shift) in state.dirty:
+                        keep.append(var)
+                    else:
+                        model.Add(var == 1)
+
+        for vars_for_slot in by_slot.values():
+            model.Add(sum(vars_for_slot) == 1)
+
+        # spread evenly, a class's busiest member works ceil(total / members) shifts
+        most_shifts = model.NewIntVar(0, len(ALL_SLOTS), 'most_shifts')
+        for c, members in enumerate(classes):
+            total = sum(by_class[c])
+            model.Add(total <= len(members) * (members[0].max_hours // SHIFT_HOURS))
+            model.Add(total <= len(members) * most_shifts)
+
+        _maximize_keeping(model, sum(assign.values()) * 100 - most_shifts * SHIFT_HOURS, keep)
+        return model, assign
+
+    def generate_horizon(self, weeks: int, demand: Optional[Demand] = None,
+                         window_weeks: int = 1, carry_over: bool = True,
+                         parallel: Optional[int] = None, time_limit: Optional[float] = None,
+                         num_workers: Optional[int] = None,
+                         budget: Optional[float] = None) -> HorizonPlan:
+        """Plan ``weeks`` weeks staffing every (day, shift, role) seat in ``demand``.
+
+        Rather than one model for the whole horizon, it is solved
+        ``window_weeks`` at a time, so the cost grows linearly with its length.
+        With ``carry_over`` each window starts from the hours worked in the
+        ones before and balances the running totals. Without it every window
+        of the same length is the same model, so each distinct length is
+        solved once, up to ``parallel`` at a time, and reused.
+        Availability, time off and demand repeat weekly, ``max_hours`` caps
+        each week and ``time_limit`` applies per window. ``budget`` caps the
+        seconds spent on the whole horizon by sharing it between the windows.
+        Plans are cached until the roster changes.
+        """
+        if weeks < 1 or window_weeks < 1:
+            raise ValueError("weeks and window_weeks must be at least 1")
+        demand = {key: count for key, count in (demand or default_demand()).items() if count > 0}
+        state = self._snapshot()
+        roster = state.roster
+        if time_limit is None:
+            time_limit = self.time_limit
+        windows = [min(window_weeks, weeks - start) for start in range(0, weeks, window_weeks)]
+        sequential = carry_over or len(windows) == 1
+        if sequential:
+            if num_workers is None:
+                num_workers = self.num_workers
+        else:
+            # at most two: the full windows and a shorter last one
+            lengths = sorted(set(windows))
+            parallel = min(parallel or os.cpu_count() or 1, len(lengths))
+            if num_workers is None:
+                # share the cores between the windows in flight
+                num_workers = max(1, (os.cpu_count() or 1) // parallel)
+        key = (roster.fingerprint(), weeks, tuple(sorted(demand.items())), window_weeks,
+               sequential, None if sequential else parallel, time_limit, num_workers, budget)
+        with self._lock:
+            plan = self._horizon_cache.get(key)
+        if plan is not None:
+            return copy.deepcopy(plan)
+
+        if sequential:
+            deadline = time.monotonic() + budget if budget is not None else None
+            # employee id -> shifts worked in the windows solved so far
+            carry = defaultdict(int)
+            results = []
+            for n, length in enumerate(windows):
+                limit = time_limit
+                if deadline is not None:
+                    # split what is left of the budget evenly over the remaining windows
+                    share = max(0.0, deadline - time.monotonic()) / (len(windows) - n)
+                    limit = share if limit is None else min(limit, share)
+                result = self._solve_window(roster, demand, length, carry, limit, num_workers)
+                for week in result[0]:
+                    for ids in week.values():
+                        for i in ids:
+                            carry[i] += 1
+                results.append(result)
+        else:
+            limit = time_limit
+            if budget is not None:
+                # the lengths run in rounds of ``parallel``; each round gets its share
+                share = budget / -(-len(lengths) // parallel)
+                limit = share if limit is None else min(limit, share)
+            with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='horizon') as pool:
+                solved = dict(zip(lengths, pool.map(
+                    lambda length: self._solve_window(roster, demand, length, {}, limit,
+                                                      num_workers), lengths)))
+            results = [solved[length] for length in windows]
+
+        plan = HorizonPlan()
+        for result, stats in results:
+            plan.stats.append(stats)
+            for week in result:
+                plan.weeks.append({day: {shift: [roster.get(i).name for i in week.get((day, shift), ())]
+                                         for shift in SHIFTS} for day in DAYS})
+                for ids in week.values():
+                    for i in ids:
+                        plan.hours[i] = plan.hours.get(i, 0) + SHIFT_HOURS
+        plan.unfilled = weeks * sum(demand.values()) - sum(plan.hours.values()) // SHIFT_HOURS
+        with self._lock:
+            if state.version == self._version:
+                self._horizon_cache[key] = plan
+                while len(self._horizon_cache) > HORIZON_CACHE_SIZE:
+                    del self._horizon_cache[next(iter(self._horizon_cache))]
+        # hand out a copy so callers cannot alter the cached plan
+        return copy.deepcopy(plan)
+
+    def _solve_window(self, roster: EmployeeRegistry, demand: Demand, weeks: int,
+                      carry: Dict[int, int], time_limit: Optional[float] = None,
+                      num_workers: Optional[int] = None):
+        """(week -> slot -> employee ids, SolveStats) for one window of the horizon."""
+        stats = SolveStats(method='horizon')
+        cp_model = _optional(CP_MODEL)
+        result = None
+        if cp_model is not None:
+            with stats.phase('build'):
+                classes = self._window_classes(roster, carry)
+                model, seats = self._build_window_model(classes, demand, weeks, carry)
+                if self.reduce_symmetry:
+                    stats.classes = len(classes)
+            solver = cp_model.CpSolver()
+            if time_limit is not None:
+                solver.parameters.max_time_in_seconds = time_limit
+            if num_workers is not None:
+                solver.parameters.num_search_workers = num_workers
+            with stats.phase('solve'):
+                status = solver.Solve(model)
+            stats.status = solver.StatusName(status)
+            stats.num_vars = len(seats)
+            stats.conflicts = solver.NumConflicts()
+            stats.branches = solver.NumBranches()
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                stats.objective = solver.ObjectiveValue()
+                with stats.phase('extract'):
+                    counts = {key: solver.Value(var) for key, var in seats.items()}
+                    result = _fill_window(classes, counts, weeks)
+        if result is None:
+            with stats.phase('heuristic'):
+                result = self._greedy_window(roster, demand, weeks, carry)
+        self._record(stats)
+        return result, stats
+
+    def _window_classes(self, roster: EmployeeRegistry,
+                        carry: Dict[int, int]) -> List[List[Employee]]:
+        """Employees who can work, grouped when they are interchangeable in a window.
+
+        That takes the same slots, shift limit, role and hours carried over;
+        without ``reduce_symmetry`` everyone is a class of their own.
+        """
+        groups: Dict[tuple, List[Employee]] = {}
+        for emp in roster:
+            mask, cap = emp.slot_mask, emp.max_hours // SHIFT_HOURS
+            if mask and cap:
+                key = ((mask, cap, emp.role, carry.get(emp.id, 0)) if self.reduce_symmetry
+                       else emp.id)
+                groups.setdefault(key, []).append(emp)
+        return list(groups.values())
+
+    @staticmethod
+    def _build_window_model(classes: List[List[Employee]], demand: Demand, weeks: int,
+                            carry: Dict[int, int]):
+        """CP-SAT model for one window plus its (class, week, day, shift, role) -> IntVar map.
+
+        A variable counts the members of a class filling that role's seats;
+        ``_fill_window`` names them afterwards.
+        """
+        model = _optional(CP_MODEL).CpModel()
+        seats = {}
+        roles_at = defaultdict(list)
+        for (day, shift, role), count in demand.items():
+            roles_at[(day, shift)].append((role, count))
+        by_seat = defaultdict(list)
+        by_shift = defaultdict(list)
+        by_week = defaultdict(list)
+        by_class = defaultdict(list)
+        for c, members in enumerate(classes):
+            first = members[0]
+            for week in range(weeks):
+                for (day, shift), bit in SLOT_BITS.items():
+                    if not first.slot_mask & bit:
+                        continue
+                    for role, count in roles_at.get((day, shift), ()):
+                        if role and first.role and role != first.role:
+                            continue
+                        var = model.NewIntVar(0, min(len(members), count),
+                                              f"y_{c}_{week}_{day}_{shift}_{role}")
+                        seats[(c, week, day, shift, role)] = var
+                        by_seat[(week, day, shift, role)].append(var)
+                        by_shift[(c, week, day, shift)].append(var)
+                        by_week[(c, week)].append(var)
+                        by_class[c].append(var)
+
+        if not seats:
+            return model, seats
+
+        for (_, day, shift, role), vars_for_seat in by_seat.items():
+            model.Add(sum(vars_for_seat) <= demand[(day, shift, role)])
+        # nobody works two seats of one shift
+        for (c, _, _, _), vars_for_shift in by_shift.items():
+            if len(vars_for_shift) > 1:
+                model.Add(sum(vars_for_shift) <= len(classes[c]))
+        for (c, _), vars_for_week in by_week.items():
+            model.Add(sum(vars_for_week) <= len(classes[c]) * (classes[c][0].max_hours // SHIFT_HOURS))
+
+        # fairness is judged on running totals: a class's busiest member ends
+        # the window on its carry-over plus ceil(shifts / members)
+        carried = {c: carry.get(classes[c][0].id, 0) for c in by_class}
+        top = max(carried.values()) + weeks * len(ALL_SLOTS)
+        peak = model.NewIntVar(0, top, 'peak')
+        worked = 0
+        for c, vars_for_class in by_class.items():
+            n = len(classes[c])
+            model.Add(sum(vars_for_class) + n * carried[c] <= n * peak)
+            worked += sum(vars_for_class) * carried[c]
+
+        # fill seats first, then keep the peak low, then prefer whoever has worked least
+        tie_weight = max(carried.values()) * weeks * sum(demand.values()) + 1
+        fill_weight = tie_weight * (top + 1)
+        model.Maximize(sum(seats.values()) * fill_weight - peak * tie_weight - worked)
+        return model, seats
+
+    @staticmethod
+    def _greedy_window(roster: EmployeeRegistry, demand: Demand, weeks: int,
+                       carry: Dict[int, int]) -> List[Dict[Tuple[str, str], List[int]]]:
+        """Seat by seat, the eligible employee with the fewest shifts so far.
+
+        Used without OR-Tools or when CP-SAT finds nothing in time. Seats for a
+        specific role are filled before the ones anybody can take.
+        """
+        order = {slot: i for i, slot in enumerate(ALL_SLOTS)}
+        seats = sorted(demand.items(), key=lambda item: (order[item[0][:2]], not item[0][2]))
+        result = [defaultdict(list) for _ in range(weeks)]
+        total = defaultdict(int, carry)
+        for week in range(weeks):
+            week_load = defaultdict(int)
+            for (day, shift, role), count in seats:
+                taken = result[week][(day, shift)]
+                free = [emp for emp in roster.eligible(day, shift)
+                        if (not role or not emp.role or emp.role == role) and emp.id not in taken
+                        and week_load[emp.id] < emp.max_hours // SHIFT_HOURS]
+                for emp in heapq.nsmallest(count, free, key=lambda e: (total[e.id], e.id)):
+                    taken.append(emp.id)
+                    week_load[emp.id] += 1
+                    total[emp.id] += 1
+        return result
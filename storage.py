@@ -0,0 +1,175 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+
+from scheduler import Employee, normalize_name
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    max_hours INTEGER NOT NULL DEFAULT 40,
+    role TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS employees_name_key ON employees(name_key);
+CREATE TABLE IF NOT EXISTS availability (
+    emp_id INTEGER NOT NULL REFERENCES employees(id),
+    day TEXT NOT NULL,
+    shift TEXT NOT NULL,
+    PRIMARY KEY (emp_id, day, shift)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS availability_slot ON availability(day, shift);
+CREATE TABLE IF NOT EXISTS time_off (
+    emp_id INTEGER NOT NULL REFERENCES employees(id),
+    day TEXT NOT NULL,
+    PRIMARY KEY (emp_id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS time_off_day ON time_off(day);
+CREATE TABLE IF NOT EXISTS imports (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# the whole roster in one round-trip; availability comes back as "day shift,..."
+LOAD_QUERY = """
+SELECT e.id, e.name, e.max_hours, e.role,
+       (SELECT group_concat(a.day || ' ' || a.shift, ',') FROM availability a WHERE a.emp_id = e.id),
+       (SELECT group_concat(t.day, ',') FROM time_off t WHERE t.emp_id = e.id)
+FROM employees e
+ORDER BY e.id
+"""
+
+
+class RosterStore(ABC):
+    """Persistence backend for a Scheduler's roster.
+
+    Availability and time off only ever grow through the Scheduler API, so
+    ``save`` adds rows and never deletes them.
+    """
+    @abstractmethod
+    def load(self) -> List[Employee]:
+        ...
+
+    @abstractmethod
+    def save(self, employees: Iterable[Employee]):
+        ...
+
+    @abstractmethod
+    def reserve_ids(self, count: int) -> int:
+        """Reserve ``count`` consecutive employee ids and return the first."""
+
+    @abstractmethod
+    def imported_files(self) -> Dict[str, str]:
+        """File name -> SHA-256 of every upload already applied."""
+
+    @abstractmethod
+    def mark_imported(self, name: str, sha256: str):
+        ...
+
+    def changed(self) -> bool:
+        """Whether another process wrote since this store last looked."""
+        return False
+
+
+class SQLiteRosterStore(RosterStore):
+    """Roster kept in SQLite (WAL mode) so several processes can share it."""
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+        self._data_version = self._version()
+
+    def _migrate(self):
+        # databases created before employees had roles
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(employees)")}
+        if 'role' not in columns:
+            self._conn.execute("ALTER TABLE employees ADD COLUMN role TEXT NOT NULL DEFAULT ''")
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self) -> List[Employee]:
+        with self._lock:
+            rows = self._conn.execute(LOAD_QUERY).fetchall()
+            self._data_version = self._version()
+        employees = []
+        for emp_id, name, max_hours, role, availability, time_off in rows:
+            emp = Employee(name=name, max_hours=max_hours, id=emp_id, role=role)
+            for pair in (availability or '').split(','):
+                if pair:
+                    day, shift = pair.split(' ', 1)
+                    emp.availability[day].add(shift)
+            emp.time_off.update(d for d in (time_off or '').split(',') if d)
+            employees.append(emp)
+        return employees
+
+    def save(self, employees: Iterable[Employee]):
+        employees = list(employees)
+        if not employees:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO employees (id, name, name_key, max_hours, role) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, "
+                "name_key = excluded.name_key, max_hours = excluded.max_hours, role = excluded.role",
+                [(e.id, e.name, normalize_name(e.name), e.max_hours, e.role) for e in employees])
+            conn.executemany(
+                "INSERT OR IGNORE INTO availability (emp_id, day, shift) VALUES (?, ?, ?)",
+                [(e.id, day, shift) for e in employees
+                 for day, shifts in e.availability.items() for shift in shifts])
+            conn.executemany(
+                "INSERT OR IGNORE INTO time_off (emp_id, day) VALUES (?, ?)",
+                [(e.id, day) for e in employees for day in e.time_off])
+
+    def reserve_ids(self, count: int) -> int:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+            top = conn.execute("SELECT coalesce(max(id), 0) + 1 FROM employees").fetchone()[0]
+            first = max(row[0] if row else 1, top)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('next_id', ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                         (first + count,))
+        return first
+
+    def imported_files(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, sha256 FROM imports"))
+
+    def mark_imported(self, name: str, sha256: str):
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO imports (name, sha256) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET sha256 = excluded.sha256",
+                         (name, sha256))
+
+    def changed(self) -> bool:
+        with self._lock:
+            return self._version() != self._data_version
+
+    def close(self):
+        with self._lock:
+            self._conn.close()